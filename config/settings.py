@@ -6,7 +6,15 @@ Configuraciones globales para la aplicación de análisis de papers de arXiv.
 
 import os
 import logging
-from typing import Dict, Any
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Any, Optional
+
+from dotenv import load_dotenv
+
+# Cargar el archivo .env de la raíz del proyecto antes de leer cualquier
+# variable: LLM_CONFIG y PIPELINE_CONFIG se resuelven al importar este módulo
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env"))
 
 # Configuración de logging
 def setup_logging():
@@ -27,29 +35,65 @@ def setup_logging():
 logger = setup_logging()
 
 # Rutas de directorios
-INPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "input", "papers")
-OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "output", "results")
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_DIR = os.path.join(BASE_DIR, "input", "papers")
+OUTPUT_DIR = os.path.join(BASE_DIR, "output", "results")
 
-# Configuración del LLM
-LLM_CONFIG: Dict[str, Any] = {
+# Configuración del LLM (de solo lectura, se resuelve una vez al importar)
+LLM_CONFIG: Mapping[str, Any] = MappingProxyType({
     "model": os.getenv("LLM_MODEL", "gpt-4"),
     "temperature": float(os.getenv("TEMPERATURE", 0.2)),
-    "max_tokens": int(os.getenv("MAX_TOKENS", 8000)),
-}
+    # Tokens máximos de cada respuesta (el cliente los usa si no recibe otro valor)
+    "max_tokens": int(os.getenv("MAX_TOKENS", 1000)),
+    # Ventana de contexto del modelo (tokens de entrada + salida)
+    "context_window": int(os.getenv("LLM_CONTEXT_WINDOW", 8192)),
+    # Número máximo de llamadas simultáneas a la API
+    "max_concurrent_requests": int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", 4)),
+    # Caché persistente de respuestas (evita repetir llamadas al reprocesar)
+    "response_cache": os.getenv("LLM_RESPONSE_CACHE", "1").lower() not in ("0", "false", "no"),
+    # Caché semántica de análisis (reutiliza el análisis de papers casi idénticos)
+    "semantic_cache": os.getenv("LLM_SEMANTIC_CACHE", "1").lower() not in ("0", "false", "no"),
+    "semantic_cache_threshold": float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", 0.97)),
+    "embedding_model": os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
+})
+
+# Configuración del pipeline
+PIPELINE_CONFIG: Mapping[str, Any] = MappingProxyType({
+    # Número de papers procesados en paralelo
+    "workers": int(os.getenv("PIPELINE_WORKERS", 8)),
+})
+
+@lru_cache(maxsize=1)
+def get_api_key() -> Optional[str]:
+    """
+    Obtiene la API key de OpenAI.
+    
+    Se resuelve en la primera llamada (después de cargar el archivo .env)
+    y se reutiliza en las siguientes.
+    """
+    return os.getenv("OPENAI_API_KEY")
 
 def verify_api_key() -> bool:
     """Verifica que la API key de OpenAI esté configurada."""
-    api_key = os.getenv("OPENAI_API_KEY")
+    api_key = get_api_key()
     if not api_key:
         logger.error("OPENAI_API_KEY no está configurada en el archivo .env")
         return False
     return True
 
+# Indica si los directorios ya fueron verificados en este proceso
+_dirs_ready = False
+
 def verify_directories() -> bool:
     """Verifica que los directorios necesarios existan, los crea si no."""
+    global _dirs_ready
+    if _dirs_ready:
+        return True
+    
     try:
         os.makedirs(INPUT_DIR, exist_ok=True)
         os.makedirs(OUTPUT_DIR, exist_ok=True)
+        _dirs_ready = True
         return True
     except Exception as e:
         logger.error(f"Error al crear directorios: {e}")
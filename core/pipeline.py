@@ -7,15 +7,20 @@ Orquestador principal del flujo de procesamiento de papers.
 
 import os
 import logging
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional
 
-from config.settings import LLM_CONFIG
-from input.file_manager import get_paper_files, check_file_processed, get_file_metadata
-from processing.pdf_extractor import extract_text_from_pdf
-from processing.text_preprocessor import preprocess_text, split_text_into_chunks
-from llm.openai_client import analyze_paper, analyze_paper_chunks
-from output.json_formatter import save_paper_analysis, format_json_for_human
+from config.settings import LLM_CONFIG, OUTPUT_DIR, PIPELINE_CONFIG
+from input.file_manager import (
+    get_paper_files,
+    list_processed_basenames,
+    load_manifest,
+    append_to_manifest,
+    check_file_processed,
+    quick_hash,
+    get_file_metadata
+)
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +41,13 @@ class Pipeline:
         # Configuración para LLM
         self.llm_model = LLM_CONFIG.get("model", "gpt-4")
         self.llm_temperature = LLM_CONFIG.get("temperature", 0.2)
+        
+        # Número de papers procesados en paralelo
+        self.max_workers = max(1, PIPELINE_CONFIG.get("workers", 8))
+        
+        # Registro de papers procesados (nombre de archivo -> huella del PDF)
+        self.manifest = load_manifest(self.output_dir or OUTPUT_DIR)
+        self._manifest_lock = threading.Lock()
     
     def process_all_papers(self) -> List[Dict[str, Any]]:
         """
@@ -53,30 +65,52 @@ class Pipeline:
         
         logger.info(f"Iniciando procesamiento de {len(pdf_files)} archivos PDF")
         
+        # Omitir los archivos ya procesados
+        if self.skip_processed:
+            # JSONs generados antes de existir el registro de procesados
+            processed = list_processed_basenames(self.output_dir or OUTPUT_DIR)
+            pending_files = []
+            for pdf_file in pdf_files:
+                base_name = os.path.basename(pdf_file)
+                if base_name in self.manifest:
+                    already_processed = check_file_processed(pdf_file, self.manifest)
+                    if not already_processed:
+                        logger.info(f"{pdf_file} cambió desde el último procesamiento")
+                else:
+                    already_processed = os.path.splitext(base_name)[0] in processed
+                
+                if already_processed:
+                    logger.info(f"Omitiendo {pdf_file} (ya procesado)")
+                else:
+                    pending_files.append(pdf_file)
+            pdf_files = pending_files
+        
         results = []
-        for pdf_file in pdf_files:
-            # Verificar si ya fue procesado
-            if self.skip_processed and check_file_processed(pdf_file, self.output_dir):
-                logger.info(f"Omitiendo {pdf_file} (ya procesado)")
-                continue
+        if not pdf_files:
+            logger.info("Todos los archivos PDF ya fueron procesados")
+            return results
+        
+        # El trabajo está dominado por E/S (API y disco), así que se procesan
+        # varios papers en paralelo. El límite de llamadas simultáneas a la API
+        # lo impone el propio cliente de OpenAI.
+        max_workers = min(self.max_workers, len(pdf_files))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.process_paper, pdf_file): pdf_file for pdf_file in pdf_files}
             
-            # Procesar paper
-            try:
-                result = self.process_paper(pdf_file)
-                results.append(result)
-                
-                # Esperar un poco entre papers para prevenir rate limits en la API
-                time.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"Error procesando {pdf_file}: {e}")
-                
-                # Añadir resultado de error
-                results.append({
-                    "nombre": os.path.basename(pdf_file),
-                    "error": f"Error: {str(e)}",
-                    "status": "error"
-                })
+            for future in as_completed(futures):
+                pdf_file = futures[future]
+                try:
+                    results.append(future.result())
+                    
+                except Exception as e:
+                    logger.error(f"Error procesando {pdf_file}: {e}")
+                    
+                    # Añadir resultado de error
+                    results.append({
+                        "nombre": os.path.basename(pdf_file),
+                        "error": f"Error: {str(e)}",
+                        "status": "error"
+                    })
         
         logger.info(f"Procesamiento completado: {len(results)} resultados")
         return results
@@ -94,16 +128,26 @@ class Pipeline:
         Raises:
             Exception: Si ocurre un error en alguna etapa del procesamiento
         """
+        # Importaciones diferidas: el SDK de OpenAI y el extractor de PDF solo se
+        # cargan cuando realmente se procesa un paper
+        from processing.pdf_extractor import extract_text_from_pdf
+        from processing.text_preprocessor import preprocess_text, split_text_into_chunks
+        from llm.openai_client import analyze_paper, analyze_paper_chunks
+        from output.json_formatter import save_paper_analysis
+        
         paper_name = os.path.basename(pdf_path)
         logger.info(f"Procesando paper: {paper_name}")
         
         try:
+            # Huella del contenido analizado, para el registro de procesados
+            file_hash = quick_hash(pdf_path)
+            
             # Paso 1: Extraer texto del PDF
             logger.info("Extrayendo texto del PDF")
             text, metadata = extract_text_from_pdf(pdf_path)
             
             # Aplicar limpieza básica
-            text = split_text_into_chunks(text, metadata)[0]['text']  # Usar solo la función de limpieza
+            text = split_text_into_chunks(text, metadata).texts[0]  # Usar solo la función de limpieza
             
             # Paso 2: Dividir en chunks
             logger.info("Dividiendo texto en chunks")
@@ -127,6 +171,7 @@ class Pipeline:
             # Paso 4: Guardar resultados
             logger.info("Guardando resultados")
             output_path = save_paper_analysis(analysis, paper_name, self.output_dir)
+            self._record_processed(paper_name, file_hash)
             
             # Añadir metadata al resultado
             result = {
@@ -142,6 +187,18 @@ class Pipeline:
             logger.error(f"Error en el procesamiento de {paper_name}: {e}")
             raise
     
+    def _record_processed(self, paper_name: str, file_hash: str) -> None:
+        """
+        Registra un paper como procesado y persiste el registro.
+        
+        Args:
+            paper_name: Nombre del archivo PDF
+            file_hash: Huella del contenido procesado
+        """
+        with self._manifest_lock:
+            self.manifest[paper_name] = file_hash
+            append_to_manifest(paper_name, file_hash, self.output_dir or OUTPUT_DIR)
+    
     def get_processing_summary(self, results: List[Dict[str, Any]]) -> str:
         """
         Genera un resumen del procesamiento.
@@ -155,29 +212,35 @@ class Pipeline:
         if not results:
             return "No se procesaron archivos."
         
-        # Contar éxitos y errores
-        success_count = sum(1 for r in results if r.get("status") == "success")
-        error_count = sum(1 for r in results if r.get("status") == "error")
+        # Separar éxitos y errores en una sola pasada
+        successes, errors = [], []
+        for result in results:
+            (successes if result.get("status") == "success" else errors).append(result)
         
         # Generar resumen
-        summary = f"Procesamiento completado.\n"
-        summary += f"Total procesados: {len(results)}\n"
-        summary += f"Exitosos: {success_count}\n"
-        summary += f"Con errores: {error_count}\n\n"
+        lines = [
+            "Procesamiento completado.",
+            f"Total procesados: {len(results)}",
+            f"Exitosos: {len(successes)}",
+            f"Con errores: {len(errors)}",
+            "",
+        ]
         
         # Listar archivos procesados
-        if success_count > 0:
-            summary += "Papers procesados exitosamente:\n"
-            for result in [r for r in results if r.get("status") == "success"]:
-                summary += f"- {result.get('nombre', 'Desconocido')}\n"
+        if successes:
+            lines.append("Papers procesados exitosamente:")
+            lines.extend(f"- {result.get('nombre', 'Desconocido')}" for result in successes)
         
         # Listar errores
-        if error_count > 0:
-            summary += "\nPapers con errores:\n"
-            for result in [r for r in results if r.get("status") == "error"]:
-                summary += f"- {result.get('nombre', 'Desconocido')}: {result.get('error', 'Error desconocido')}\n"
+        if errors:
+            lines.append("")
+            lines.append("Papers con errores:")
+            lines.extend(
+                f"- {result.get('nombre', 'Desconocido')}: {result.get('error', 'Error desconocido')}"
+                for result in errors
+            )
         
-        return summary
+        return "\n".join(lines) + "\n"
 
 # Funciones de conveniencia para uso directo
 def run_pipeline(output_dir: Optional[str] = None, skip_processed: bool = True) -> List[Dict[str, Any]]:
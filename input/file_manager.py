@@ -6,12 +6,28 @@ Módulo para gestionar archivos de entrada.
 """
 
 import os
+import json
+import hashlib
 import logging
-from typing import List, Dict, Optional
+import threading
+from typing import List, Dict, FrozenSet, Optional
 from config.settings import INPUT_DIR
 
 logger = logging.getLogger(__name__)
 
+# Archivo con el registro de papers procesados (dentro del directorio de salida)
+MANIFEST_FILENAME = ".processed.json"
+
+# Diario con los papers registrados desde la última compactación del registro,
+# una línea JSON por paper
+MANIFEST_JOURNAL_FILENAME = ".processed.jsonl"
+
+# Bytes leídos del inicio del PDF para calcular su huella
+QUICK_HASH_BYTES = 64 * 1024
+
+# Serializa las escrituras al diario desde varios hilos
+_JOURNAL_LOCK = threading.Lock()
+
 def get_paper_files() -> List[str]:
     """
     Obtiene la lista de archivos PDF disponibles en el directorio de entrada.
@@ -20,47 +36,219 @@ def get_paper_files() -> List[str]:
         Lista de rutas completas a los archivos PDF
     """
     try:
-        if not os.path.exists(INPUT_DIR):
-            logger.warning(f"El directorio {INPUT_DIR} no existe")
-            return []
-        
-        pdf_files = [
-            os.path.join(INPUT_DIR, f) for f in os.listdir(INPUT_DIR)
-            if f.lower().endswith('.pdf')
-        ]
+        with os.scandir(INPUT_DIR) as entries:
+            pdf_files = [
+                entry.path for entry in entries
+                if entry.is_file(follow_symlinks=False) and entry.name.lower().endswith('.pdf')
+            ]
         
         logger.info(f"Encontrados {len(pdf_files)} archivos PDF en {INPUT_DIR}")
         return pdf_files
     
+    except FileNotFoundError:
+        logger.warning(f"El directorio {INPUT_DIR} no existe")
+        return []
     except Exception as e:
         logger.error(f"Error al buscar archivos PDF: {e}")
         return []
 
-def check_file_processed(file_path: str, output_dir: str) -> bool:
+def quick_hash(file_path: str) -> str:
     """
-    Verifica si un archivo ya ha sido procesado previamente.
+    Calcula una huella rápida del contenido de un archivo.
+    
+    Usa el tamaño del archivo y sus primeros 64 KB, suficiente para detectar
+    que un PDF fue reemplazado sin leerlo completo.
+    
+    Args:
+        file_path: Ruta del archivo
+        
+    Returns:
+        Huella SHA-1 en hexadecimal
+    """
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        digest.update(str(os.fstat(f.fileno()).st_size).encode())
+        digest.update(f.read(QUICK_HASH_BYTES))
+    return digest.hexdigest()
+
+def load_manifest(output_dir: str) -> Dict[str, str]:
+    """
+    Carga el registro de papers procesados.
+    
+    Las entradas del diario (ver append_to_manifest) se aplican sobre el
+    registro y, si había alguna, se compactan en él y el diario se vacía.
     
     Args:
-        file_path: Ruta del archivo a verificar
         output_dir: Directorio de salida donde se guardan los JSONs
         
     Returns:
-        True si ya existe un JSON para este archivo, False en caso contrario
+        Diccionario nombre de archivo -> huella del PDF procesado
     """
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    manifest = {}
     try:
-        # Obtener nombre base del archivo
-        base_name = os.path.basename(file_path)
-        file_name = os.path.splitext(base_name)[0]
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        
+        if not isinstance(manifest, dict):
+            logger.warning(f"Registro de procesados inválido en {manifest_path}, se ignora")
+            manifest = {}
+    
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error(f"Error al cargar el registro de procesados {manifest_path}: {e}")
+        manifest = {}
+    
+    journal_path = os.path.join(output_dir, MANIFEST_JOURNAL_FILENAME)
+    try:
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            journal = f.readlines()
+    except FileNotFoundError:
+        return manifest
+    except Exception as e:
+        logger.error(f"Error al cargar el diario de procesados {journal_path}: {e}")
+        return manifest
+    
+    for line in journal:
+        try:
+            entry = json.loads(line)
+            manifest[entry['name']] = entry['hash']
+        except (ValueError, KeyError, TypeError):
+            # Línea incompleta (p. ej. escritura interrumpida)
+            logger.warning(f"Entrada inválida en el diario de procesados {journal_path}, se ignora")
+    
+    # Compactar: el diario se vacía solo después de guardar el registro completo
+    if save_manifest(manifest, output_dir):
+        try:
+            os.remove(journal_path)
+        except OSError as e:
+            logger.error(f"Error al vaciar el diario de procesados {journal_path}: {e}")
+    
+    return manifest
+
+def save_manifest(manifest: Dict[str, str], output_dir: str) -> bool:
+    """
+    Guarda el registro de papers procesados de forma atómica.
+    
+    Reescribe el registro completo; para registrar papers uno a uno durante
+    el procesamiento se usa append_to_manifest.
+    
+    Args:
+        manifest: Diccionario nombre de archivo -> huella del PDF procesado
+        output_dir: Directorio de salida donde se guardan los JSONs
+        
+    Returns:
+        True si el registro se guardó, False en caso contrario
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    tmp_path = manifest_path + ".tmp"
+    
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, manifest_path)
+        return True
+    
+    except Exception as e:
+        logger.error(f"Error al guardar el registro de procesados {manifest_path}: {e}")
+        return False
+
+def append_to_manifest(file_name: str, file_hash: str, output_dir: str) -> None:
+    """
+    Registra un paper procesado añadiendo una línea al diario del registro.
+    
+    El coste no depende del tamaño del registro; load_manifest compacta el
+    diario en el registro completo. La línea se sincroniza con el disco antes
+    de volver, para que una interrupción no pierda papers ya guardados.
+    
+    Args:
+        file_name: Nombre del archivo PDF
+        file_hash: Huella del PDF procesado
+        output_dir: Directorio de salida donde se guardan los JSONs
+    """
+    journal_path = os.path.join(output_dir, MANIFEST_JOURNAL_FILENAME)
+    line = json.dumps({'name': file_name, 'hash': file_hash}, ensure_ascii=False) + '\n'
+    
+    try:
+        with _JOURNAL_LOCK, open(journal_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    except Exception as e:
+        logger.error(f"Error al actualizar el diario de procesados {journal_path}: {e}")
+
+def check_file_processed(file_path: str, manifest: Dict[str, str]) -> bool:
+    """
+    Verifica si un archivo ya ha sido procesado previamente.
+    
+    Args:
+        file_path: Ruta del archivo a verificar
+        manifest: Registro de papers procesados (ver load_manifest)
         
-        # Verificar si existe un JSON con el mismo nombre
-        json_path = os.path.join(output_dir, f"{file_name}.json")
+    Returns:
+        True si el archivo está registrado y su contenido no cambió, False en caso contrario
+    """
+    try:
+        recorded_hash = manifest.get(os.path.basename(file_path))
+        if recorded_hash is None:
+            return False
         
-        return os.path.exists(json_path)
+        return recorded_hash == quick_hash(file_path)
     
     except Exception as e:
         logger.error(f"Error al verificar si el archivo fue procesado: {e}")
         return False
 
+def list_processed_basenames(output_dir: str) -> FrozenSet[str]:
+    """
+    Obtiene los nombres base de los archivos ya procesados en una sola lectura del directorio.
+    
+    Args:
+        output_dir: Directorio de salida donde se guardan los JSONs
+        
+    Returns:
+        Conjunto con los nombres (sin extensión) de los JSONs existentes
+    """
+    try:
+        with os.scandir(output_dir) as entries:
+            return frozenset(
+                entry.name[:-len('.json')] for entry in entries
+                if entry.name.endswith('.json') and not entry.name.startswith('.')
+            )
+    
+    except FileNotFoundError:
+        return frozenset()
+    except Exception as e:
+        logger.error(f"Error al listar los archivos procesados en {output_dir}: {e}")
+        return frozenset()
+
+def get_processed_mtimes(output_dir: str) -> Dict[str, float]:
+    """
+    Obtiene la fecha de modificación de los JSONs ya generados en una sola lectura del directorio.
+    
+    Args:
+        output_dir: Directorio de salida donde se guardan los JSONs
+        
+    Returns:
+        Diccionario nombre (sin extensión) -> fecha de modificación del JSON
+    """
+    try:
+        with os.scandir(output_dir) as entries:
+            return {
+                entry.name[:-len('.json')]: entry.stat().st_mtime for entry in entries
+                if entry.name.endswith('.json') and not entry.name.startswith('.')
+            }
+    
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error(f"Error al listar los archivos procesados en {output_dir}: {e}")
+        return {}
+
 def get_file_metadata(file_path: str) -> Dict[str, str]:
     """
     Obtiene metadatos básicos del archivo.
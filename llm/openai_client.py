@@ -5,15 +5,28 @@
 Cliente para interactuar con la API de OpenAI.
 """
 
-import os
+import re
 import json
+import atexit
 import time
+import random
 import logging
-from typing import Dict, Any, Optional, List
-from openai import OpenAI  # Importación correcta
+import threading
+from functools import lru_cache
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
 
+import orjson
+
+from config.settings import LLM_CONFIG, get_api_key
+from llm.rate_limiter import RateLimiter
+from llm.response_cache import ResponseCache, SemanticCache, get_response_cache, get_semantic_cache
 from llm.prompt_templates import (
+    SYSTEM_PROMPT,
+    PROMPT_VERSION,
     get_paper_analysis_prompt, 
+    get_batch_analysis_prompt,
     get_chunk_initial_prompt,
     get_chunk_middle_prompt,
     get_chunk_final_prompt,
@@ -22,6 +35,329 @@ from llm.prompt_templates import (
 
 logger = logging.getLogger(__name__)
 
+# Limita las llamadas simultáneas a la API entre todos los clientes e hilos
+_API_SEMAPHORE = threading.BoundedSemaphore(max(1, LLM_CONFIG.get("max_concurrent_requests", 4)))
+
+# Presupuesto de peticiones y tokens informado por la API, compartido entre hilos
+_RATE_LIMITER = RateLimiter()
+
+# Conexiones HTTP reutilizables compartidas por todos los clientes
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 32
+HTTP_MAX_CONNECTIONS = 64
+HTTP_TIMEOUT = 60.0
+
+# Espera máxima entre reintentos (segundos)
+MAX_RETRY_DELAY = 60
+
+# Número máximo de chunks de un mismo paper analizados en paralelo
+MAX_CHUNK_WORKERS = 6
+
+# Límite de caracteres para el prompt (considerando que ~4 caracteres = 1 token).
+# El total no debe exceder ~8,000 tokens, así que permitimos ~6,500 tokens para el prompt
+MAX_PROMPT_CHARS = 6500 * 4  # ~26,000 caracteres
+
+# Tokens de respuesta reservados por cada paper analizado
+OUTPUT_TOKENS_PER_PAPER = 1000
+
+# Tokens reservados para las instrucciones del prompt de análisis por lotes
+BATCH_PROMPT_OVERHEAD_TOKENS = 400
+
+# Tokens reservados para el formato de los mensajes y la descripción de cada parte
+MESSAGE_OVERHEAD_TOKENS = 50
+
+# Tokens compartidos entre partes consecutivas de un paper demasiado largo
+CHUNK_OVERLAP_TOKENS = 200
+
+# Segundos entre consultas del estado de un lote de la Batch API
+BATCH_POLL_INTERVAL = 60
+
+# Separador que delimita el texto del paper dentro de los prompts
+PROMPT_SEPARATOR = "-----"
+
+# Caracteres máximos del texto usado para calcular el embedding de un paper
+# (el modelo de embeddings admite ~8,000 tokens de entrada)
+MAX_EMBEDDING_CHARS = 7500 * 3
+
+# Modelos que admiten response_format={"type": "json_object"} (JSON mode)
+JSON_MODE_MODEL_PREFIXES = ("gpt-4o", "gpt-4-turbo", "gpt-4-1106", "gpt-4-0125", "gpt-4.1", "gpt-3.5-turbo")
+
+# Bloque JSON envuelto en ```json ... ``` (o ``` ... ```) dentro de la respuesta
+_JSON_FENCE = re.compile(r"```(?:json)?\s*(\{.*?\}|\[.*?\])\s*```", re.DOTALL)
+
+@lru_cache(maxsize=1)
+def _get_http_client() -> Any:
+    """
+    Devuelve el cliente HTTP compartido por todos los clientes de OpenAI.
+    
+    Reutilizar un único pool de conexiones keep-alive (HTTP/2 si está disponible)
+    evita pagar el handshake TCP+TLS en cada llamada a la API.
+    
+    Returns:
+        Instancia de httpx.Client
+    """
+    import httpx
+    
+    options = {
+        "limits": httpx.Limits(max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                               max_connections=HTTP_MAX_CONNECTIONS),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT),
+    }
+    
+    try:
+        client = httpx.Client(http2=True, **options)
+    except ImportError:
+        logger.warning("Paquete h2 no disponible, usando HTTP/1.1 para la API de OpenAI")
+        client = httpx.Client(**options)
+    
+    atexit.register(client.close)
+    return client
+
+def _parse_json(payload: str) -> Any:
+    """
+    Parsea un texto JSON usando orjson y, si falla, la librería estándar.
+    
+    Args:
+        payload: Texto JSON
+        
+    Returns:
+        Objeto JSON parseado
+        
+    Raises:
+        json.JSONDecodeError: Si el texto no es un JSON válido
+    """
+    try:
+        return orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        # json es más permisivo (p. ej. NaN o enteros fuera de rango)
+        return json.loads(payload)
+
+def _json_payload(content: str) -> str:
+    """
+    Extrae el JSON de una respuesta del modelo, si está envuelto en ```json ... ```.
+    
+    Args:
+        content: Contenido de la respuesta
+        
+    Returns:
+        Texto JSON de la respuesta
+    """
+    fence_match = _JSON_FENCE.search(content)
+    return fence_match.group(1) if fence_match else content.strip()
+
+# Caracteres aproximados por token, cuando no se dispone del tokenizador
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str) -> Any:
+    """
+    Obtiene (una sola vez por modelo) el tokenizador de tiktoken.
+    
+    Args:
+        model: Modelo de OpenAI
+        
+    Returns:
+        Codificación de tiktoken, o None si no se pudo cargar
+    """
+    try:
+        import tiktoken
+        
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    
+    except Exception as e:
+        # tiktoken descarga el vocabulario la primera vez; sin él se estima por caracteres
+        logger.warning(f"No se pudo cargar el tokenizador para {model}, se estimarán los tokens: {e}")
+        return None
+
+def count_tokens(text: str, model: str) -> int:
+    """
+    Cuenta los tokens de un texto para un modelo.
+    
+    Args:
+        text: Texto a medir
+        model: Modelo de OpenAI
+        
+    Returns:
+        Número de tokens
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN
+    
+    return len(encoding.encode(text, disallowed_special=()))
+
+@lru_cache(maxsize=8)
+def prompt_overhead_tokens(model: str) -> int:
+    """
+    Cuenta (una sola vez por modelo) los tokens fijos de los prompts de análisis.
+    
+    Las instrucciones de las plantillas no cambian entre llamadas, así que se
+    tokenizan una vez y el presupuesto de cada paper solo depende de su texto.
+    
+    Args:
+        model: Modelo de OpenAI
+        
+    Returns:
+        Tokens del mensaje de sistema más la plantilla más larga, sin el texto del paper
+    """
+    templates = (
+        get_paper_analysis_prompt(""),
+        get_chunk_initial_prompt("", ""),
+        get_chunk_middle_prompt("", ""),
+        get_chunk_final_prompt("", ""),
+    )
+    return (count_tokens(SYSTEM_PROMPT, model)
+            + max(count_tokens(template, model) for template in templates)
+            + MESSAGE_OVERHEAD_TOKENS)
+
+def split_token_windows(text: str, model: str, max_tokens: int, overlap: int = 0) -> List[str]:
+    """
+    Divide un texto en ventanas de como máximo max_tokens tokens, solapadas.
+    
+    Args:
+        text: Texto a dividir
+        model: Modelo de OpenAI (determina el tokenizador)
+        max_tokens: Tokens máximos por ventana
+        overlap: Tokens compartidos entre ventanas consecutivas
+        
+    Returns:
+        Lista de ventanas de texto (una sola si el texto cabe entero)
+    """
+    step = max(1, max_tokens - overlap)
+    
+    encoding = _get_encoding(model)
+    if encoding is None:
+        # Sin tokenizador se trabaja con la estimación en caracteres
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return [text]
+        
+        overlap_chars = overlap * CHARS_PER_TOKEN
+        return [
+            text[start:start + max_chars]
+            for start in range(0, max(len(text) - overlap_chars, 1), step * CHARS_PER_TOKEN)
+        ]
+    
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return [text]
+    
+    return [
+        encoding.decode(tokens[start:start + max_tokens])
+        for start in range(0, max(len(tokens) - overlap, 1), step)
+    ]
+
+def _is_retryable(error: Exception) -> bool:
+    """
+    Indica si un error de la API es transitorio y merece reintentarse.
+    
+    Se reintentan los errores de conexión, los de rate limit (429), los de
+    timeout o conflicto (408, 409) y los errores del servidor (5xx); el resto de
+    errores 4xx (petición inválida, autenticación, etc.) no cambiarían al reintentar.
+    
+    Args:
+        error: Excepción producida en la llamada
+        
+    Returns:
+        True si se debe reintentar
+    """
+    from openai import APIConnectionError, APIStatusError, RateLimitError
+    
+    if isinstance(error, (APIConnectionError, RateLimitError)):
+        return True
+    
+    if isinstance(error, APIStatusError):
+        return error.status_code >= 500 or error.status_code in (408, 409)
+    
+    return False
+
+def _is_complete_analysis(analysis: Dict[str, Any]) -> bool:
+    """
+    Indica si un análisis tiene todos los campos que piden las plantillas.
+    
+    Las respuestas que no se pudieron interpretar (error de formato o de
+    procesamiento) se sustituyen en _process_response por un análisis con
+    "exito" a None, o con un campo "error"; esas no se guardan en caché.
+    
+    Args:
+        analysis: Análisis de un paper
+        
+    Returns:
+        True si el análisis está completo
+    """
+    return ("error" not in analysis
+            and isinstance(analysis.get("exito"), bool)
+            and all(field in analysis for field in ("resumen", "resultados", "performance")))
+
+def _completion_from_content(content: str) -> Any:
+    """
+    Construye un objeto con la misma forma que una respuesta de la API
+    (response.choices[0].message.content) a partir de su contenido.
+    
+    Args:
+        content: Contenido del mensaje
+        
+    Returns:
+        Objeto equivalente a la respuesta de la API
+    """
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+class BatchPlanner:
+    """
+    Agrupa papers en lotes a medida que llegan, tokenizando cada paper una sola vez.
+    
+    Cada paper ocupa sus tokens de entrada más los tokens reservados para su
+    respuesta; un lote no supera el presupuesto de tokens indicado.
+    """
+    
+    def __init__(self, model: str, budget: int):
+        """
+        Inicializa el planificador.
+        
+        Args:
+            model: Modelo de OpenAI (para contar tokens)
+            budget: Tokens disponibles para los papers de un lote y sus respuestas
+        """
+        self.model = model
+        self.budget = budget
+        self._batch = []
+        self._tokens = 0
+    
+    def add(self, paper: Tuple[str, str]) -> Optional[List[Tuple[str, str]]]:
+        """
+        Añade un paper al lote en curso.
+        
+        Args:
+            paper: Tupla (nombre del paper, texto del paper)
+            
+        Returns:
+            El lote anterior si el paper ya no cabía en él (el paper inicia un
+            lote nuevo), o None si el lote sigue admitiendo papers
+        """
+        paper_tokens = count_tokens(paper[1], self.model) + OUTPUT_TOKENS_PER_PAPER
+        
+        full_batch = None
+        if self._batch and self._tokens + paper_tokens > self.budget:
+            full_batch = self.flush()
+        
+        self._batch.append(paper)
+        self._tokens += paper_tokens
+        return full_batch
+    
+    def flush(self) -> List[Tuple[str, str]]:
+        """
+        Cierra el lote en curso.
+        
+        Returns:
+            Lista de tuplas (nombre, texto) del lote, vacía si no había papers
+        """
+        batch = self._batch
+        self._batch = []
+        self._tokens = 0
+        return batch
+
 class OpenAIClient:
     """Cliente para interactuar con la API de OpenAI."""
     
@@ -29,7 +365,7 @@ class OpenAIClient:
                  api_key: Optional[str] = None, 
                  model: str = "gpt-4", 
                  temperature: float = 0.2,
-                 max_tokens: int = 1000,  # Valor por defecto más bajo
+                 max_tokens: Optional[int] = None,
                  max_retries: int = 3,
                  retry_delay: int = 5):
         """
@@ -39,24 +375,48 @@ class OpenAIClient:
             api_key: Clave de API de OpenAI (si no se proporciona, se toma de OPENAI_API_KEY)
             model: Modelo de OpenAI a utilizar
             temperature: Temperatura para la generación (0.0 a 1.0)
-            max_tokens: Número máximo de tokens en la respuesta
+            max_tokens: Número máximo de tokens en la respuesta (por defecto,
+                MAX_TOKENS de la configuración, 1000 si no está definido)
             max_retries: Número máximo de reintentos en caso de error
             retry_delay: Tiempo de espera entre reintentos (segundos)
         """
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.api_key = api_key or get_api_key()
         if not self.api_key:
             logger.error("No se ha proporcionado una API key de OpenAI")
             raise ValueError("Se requiere una API key de OpenAI")
         
         self.model = model
         self.temperature = temperature
-        # Usar el valor del entorno si está disponible, sino el proporcionado como argumento
-        self.max_tokens = int(os.getenv("MAX_TOKENS", max_tokens))
+        # Un valor explícito tiene prioridad sobre el de la configuración
+        self.max_tokens = max_tokens if max_tokens is not None else LLM_CONFIG.get("max_tokens", 1000)
+        # Tokens de entrada y salida que admite el modelo en una petición
+        self.context_window = LLM_CONFIG.get("context_window", 8192)
+        # Tokens máximos del prompt de usuario (ver _truncate_prompt)
+        request_token_limit = min(self.context_window - OUTPUT_TOKENS_PER_PAPER, MAX_PROMPT_CHARS // CHARS_PER_TOKEN)
+        self.system_prompt_tokens = count_tokens(SYSTEM_PROMPT, model)
+        self.prompt_token_limit = request_token_limit - self.system_prompt_tokens
+        # Tokens de texto del paper que caben en una sola petición (sin llegar al
+        # límite de _truncate_prompt, que solo actúa como red de seguridad)
+        self.paper_token_budget = request_token_limit - prompt_overhead_tokens(model)
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        # Con JSON mode la API garantiza que la respuesta es un objeto JSON válido
+        self.json_mode = model.startswith(JSON_MODE_MODEL_PREFIXES)
+        
+        # Mensaje de sistema invariante, reutilizado en todas las llamadas
+        self._system_msg = {"role": "system", "content": SYSTEM_PROMPT}
         
-        # Inicializar cliente de OpenAI - Actualizado para la versión actual
-        self.client = OpenAI(api_key=self.api_key)
+        # Caché persistente de respuestas (opcional)
+        self.response_cache = get_response_cache() if LLM_CONFIG.get("response_cache", True) else None
+        self.semantic_cache = get_semantic_cache() if LLM_CONFIG.get("semantic_cache", True) else None
+        self.embedding_model = LLM_CONFIG.get("embedding_model", "text-embedding-3-small")
+        # Los análisis guardados solo se reutilizan con el mismo modelo, temperatura y plantillas
+        self.cache_namespace = f"{self.model}|{self.temperature}|{PROMPT_VERSION}"
+        
+        # Inicializar cliente de OpenAI (importación diferida: el SDK es costoso de cargar)
+        # (sin reintentos del SDK: los gestiona _call_api con su propia espera)
+        from openai import OpenAI
+        self.client = OpenAI(api_key=self.api_key, http_client=_get_http_client(), max_retries=0)
         logger.info(f"Cliente OpenAI inicializado con modelo {self.model}, max_tokens={self.max_tokens}")
     
     def analyze_paper(self, paper_text: str, paper_name: str) -> Dict[str, Any]:
@@ -72,77 +432,374 @@ class OpenAIClient:
         """
         logger.info(f"Analizando paper: {paper_name}")
         
-        # Obtener el prompt para el análisis
-        prompt = get_paper_analysis_prompt(paper_text)
-        
-        # Truncar el prompt si es demasiado largo
-        prompt = self._truncate_prompt(prompt)
+        cached_analysis, text_hash, embedding = self._lookup_cache(paper_text, paper_name)
+        if cached_analysis is not None:
+            return cached_analysis
         
-        # Realizar llamada a la API
-        response = self._call_api(prompt)
+        return self._analyze_uncached(paper_text, paper_name, text_hash, embedding)
+    
+    def _analyze_uncached(self, paper_text: str, paper_name: str,
+                          text_hash: Optional[str], embedding: Optional[List[float]]) -> Dict[str, Any]:
+        """
+        Analiza un paper que no está en la caché semántica y guarda el resultado.
         
-        # Procesar la respuesta
-        analysis = self._process_response(response, paper_name)
+        Args:
+            paper_text: Texto del paper a analizar
+            paper_name: Nombre del paper
+            text_hash: Huella del texto devuelta por _lookup_cache
+            embedding: Embedding del texto devuelto por _lookup_cache
+            
+        Returns:
+            Diccionario con el análisis del paper
+        """
+        # Los papers que no caben en una sola petición se analizan por partes
+        # solapadas y se consolidan, en lugar de fallar o perder el final del texto
+        windows = split_token_windows(paper_text, self.model, self.paper_token_budget, CHUNK_OVERLAP_TOKENS)
+        if len(windows) > 1:
+            logger.info(f"{paper_name} excede {self.paper_token_budget} tokens, se analizará en {len(windows)} partes")
+            analysis = self.analyze_paper_in_chunks(
+                [{"text": window, "metadata": {}} for window in windows], paper_name
+            )
+        else:
+            # Obtener el prompt para el análisis
+            prompt = get_paper_analysis_prompt(paper_text)
+            
+            # Truncar el prompt si es demasiado largo
+            prompt = self._truncate_prompt(prompt)
+            
+            # Realizar llamada a la API
+            response = self._call_api(prompt)
+            
+            # Procesar la respuesta
+            analysis = self._process_response(response, paper_name)
         
+        self._store_cache(text_hash, embedding, analysis, paper_text)
         return analysis
     
-    def analyze_paper_in_chunks(self, chunks: List[Dict[str, Any]], paper_name: str) -> Dict[str, Any]:
+    def _lookup_cache(self, paper_text: str,
+                      paper_name: str) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[List[float]]]:
         """
-        Analiza un paper dividido en chunks y consolida los resultados.
+        Busca el análisis de un paper en la caché semántica, primero por texto
+        idéntico y después por similitud.
         
         Args:
-            chunks: Lista de chunks con texto y metadatos
+            paper_text: Texto del paper
             paper_name: Nombre del paper
             
         Returns:
-            Diccionario con el análisis consolidado
+            Tupla (análisis o None, huella del texto, embedding del texto); la
+            huella y el embedding se pasan a _store_cache para no recalcularlos
         """
-        logger.info(f"Analizando paper en {len(chunks)} chunks: {paper_name}")
+        if self.semantic_cache is None:
+            return None, None, None
+        
+        embedding = None
+        text_hash = SemanticCache.hash_text(paper_text, self.cache_namespace)
+        cached_analysis = self.semantic_cache.get_exact(text_hash)
+        if cached_analysis is None:
+            embedding = self._embed(paper_text)
+            if embedding is not None:
+                cached_analysis = self.semantic_cache.get_similar(
+                    embedding, len(paper_text), self.cache_namespace
+                )
+        
+        if cached_analysis is not None:
+            logger.info(f"Análisis de {paper_name} obtenido de la caché semántica")
+            # Como en _process_response, el nombre del archivo solo sustituye
+            # a un título ausente
+            if not cached_analysis.get("nombre"):
+                cached_analysis["nombre"] = paper_name
+        
+        return cached_analysis, text_hash, embedding
+    
+    def _store_cache(self, text_hash: Optional[str], embedding: Optional[List[float]],
+                     analysis: Dict[str, Any], paper_text: str) -> None:
+        """
+        Guarda el análisis de un paper en la caché semántica.
+        
+        Solo se guardan análisis completos (sin errores de formato o de procesamiento).
+        
+        Args:
+            text_hash: Huella del texto devuelta por _lookup_cache (None sin caché)
+            embedding: Embedding del texto devuelto por _lookup_cache
+            analysis: Análisis del paper
+            paper_text: Texto del paper
+        """
+        if text_hash is not None and _is_complete_analysis(analysis):
+            self.semantic_cache.add(text_hash, embedding, analysis, len(paper_text), self.cache_namespace)
+    
+    def _embed(self, text: str) -> Optional[List[float]]:
+        """
+        Calcula el embedding de un texto para la caché semántica.
+        
+        Args:
+            text: Texto del paper
+            
+        Returns:
+            Embedding del texto, o None si no se pudo calcular
+        """
+        # Pasa por el mismo limitador y los mismos reintentos que las completions:
+        # un 429 transitorio no debe convertirse en un fallo de caché
+        text = text[:MAX_EMBEDDING_CHARS]
+        request = {"model": self.embedding_model, "input": text}
+        try:
+            response = self._request_with_retries(
+                self.client.embeddings.with_raw_response.create, request, len(text) // CHARS_PER_TOKEN
+            )
+            return response.data[0].embedding
+        
+        except Exception as e:
+            logger.warning(f"No se pudo calcular el embedding para la caché semántica: {e}")
+            return None
+    
+    def batch_planner(self) -> BatchPlanner:
+        """
+        Crea un planificador de lotes para este modelo.
+        
+        El presupuesto de un lote es la ventana de contexto del modelo menos las
+        instrucciones del prompt de análisis por lotes.
+        
+        Returns:
+            Instancia de BatchPlanner vacía
+        """
+        return BatchPlanner(self.model, self.context_window - BATCH_PROMPT_OVERHEAD_TOKENS)
+    
+    def plan_batches(self, papers: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        """
+        Agrupa papers en lotes que caben en una sola petición (ver BatchPlanner).
         
-        chunk_results = []
+        Args:
+            papers: Lista de tuplas (nombre del paper, texto del paper)
+            
+        Returns:
+            Lista de lotes, cada uno con una lista de tuplas (nombre, texto)
+        """
+        planner = self.batch_planner()
+        batches = [batch for batch in map(planner.add, papers) if batch]
+        
+        last_batch = planner.flush()
+        if last_batch:
+            batches.append(last_batch)
         
-        # Obtener un análisis para cada chunk
-        for i, chunk in enumerate(chunks):
-            chunk_text = chunk['text']
-            chunk_metadata = chunk['metadata']
+        return batches
+    
+    def analyze_papers_batch(self, papers: List[Tuple[str, str]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Analiza varios papers en una sola llamada a la API.
+        
+        Los papers que ya están en la caché semántica no se envían. Si el prompt
+        combinado no cabe en la ventana de contexto o la respuesta no se puede
+        interpretar, los papers sin análisis se procesan individualmente.
+        
+        Args:
+            papers: Lista de tuplas (nombre del paper, texto del paper)
             
-            # Adaptar el prompt para indicar que es parte de un documento mayor
-            section_info = chunk_metadata.get('section', 'texto')
-            part_info = chunk_metadata.get('chunk_part', '')
-            chunk_info = f"Parte {i+1}/{len(chunks)} - Sección: {section_info}"
-            if part_info:
-                chunk_info += f" (Parte {part_info})"
+        Returns:
+            Diccionario nombre del paper -> análisis
+        """
+        analyses = {}
+        lookups = {}
+        uncached = []
+        for paper_name, paper_text in papers:
+            cached_analysis, text_hash, embedding = self._lookup_cache(paper_text, paper_name)
+            if cached_analysis is not None:
+                analyses[paper_name] = cached_analysis
+            else:
+                lookups[paper_name] = (text_hash, embedding)
+                uncached.append((paper_name, paper_text))
+        
+        if len(uncached) > 1:
+            logger.info(f"Analizando lote de {len(uncached)} papers")
             
-            logger.info(f"Procesando {chunk_info}")
+            # Los papers se identifican por su posición para no depender de sus nombres
+            prompt = get_batch_analysis_prompt([(str(i), text) for i, (_, text) in enumerate(uncached, 1)])
+            output_tokens = OUTPUT_TOKENS_PER_PAPER * len(uncached)
             
-            # Usar un prompt específico para chunks
-            if i == 0:
-                # El primer chunk incluye instrucciones de inicio
-                prompt = get_chunk_initial_prompt(chunk_text, chunk_info)
-            elif i == len(chunks) - 1:
-                # El último chunk incluye instrucciones de finalización/resumen
-                prompt = get_chunk_final_prompt(chunk_text, chunk_info)
+            # El plan de lotes es una estimación; el prompt real se comprueba antes de enviarlo
+            request_tokens = (self.system_prompt_tokens + count_tokens(prompt, self.model)
+                              + MESSAGE_OVERHEAD_TOKENS + output_tokens)
+            if request_tokens > self.context_window:
+                logger.warning(f"El lote de {len(uncached)} papers requiere {request_tokens} tokens "
+                               f"y excede la ventana de contexto ({self.context_window})")
             else:
-                # Chunks intermedios
-                prompt = get_chunk_middle_prompt(chunk_text, chunk_info)
+                try:
+                    response = self._call_api(prompt, max_tokens=output_tokens)
+                    content = response.choices[0].message.content
+                    
+                    batch_result = _parse_json(_json_payload(content))
+                    if not isinstance(batch_result, dict):
+                        raise ValueError("La respuesta del lote no es un objeto JSON")
+                    
+                    for i, (paper_name, paper_text) in enumerate(uncached, 1):
+                        analysis = batch_result.get(str(i))
+                        if isinstance(analysis, dict):
+                            if not analysis.get("nombre"):
+                                analysis["nombre"] = paper_name
+                            analyses[paper_name] = analysis
+                            self._store_cache(*lookups[paper_name], analysis, paper_text)
+                    
+                except Exception as e:
+                    logger.warning(f"No se pudo procesar la respuesta del lote: {e}")
+        
+        # Procesar individualmente los papers que no obtuvieron análisis
+        for paper_name, paper_text in uncached:
+            if paper_name not in analyses:
+                logger.info(f"Analizando {paper_name} de forma individual")
+                analyses[paper_name] = self._analyze_uncached(paper_text, paper_name, *lookups[paper_name])
+        
+        return analyses
+    
+    def submit_batch(self, papers: List[Tuple[str, str]]) -> str:
+        """
+        Envía el análisis de varios papers a la Batch API de OpenAI.
+        
+        Cada paper es una petición independiente de chat completions dentro de
+        un archivo JSONL; la API las procesa de forma asíncrona (hasta 24h).
+        
+        Args:
+            papers: Lista de tuplas (nombre del paper, texto del paper)
             
-            # Truncar el prompt si es necesario
-            prompt = self._truncate_prompt(prompt)
+        Returns:
+            Identificador del lote creado
+        """
+        lines = []
+        for paper_name, paper_text in papers:
+            prompt = self._truncate_prompt(get_paper_analysis_prompt(paper_text))
+            lines.append(orjson.dumps({
+                "custom_id": paper_name,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._build_request(prompt),
+            }))
+        
+        batch_file = self.client.files.create(file=("batch.jsonl", b"\n".join(lines)), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        
+        logger.info(f"Lote {batch.id} enviado a la Batch API con {len(papers)} papers")
+        return batch.id
+    
+    def wait_for_batch(self, batch_id: str, poll_interval: int = BATCH_POLL_INTERVAL) -> Dict[str, Dict[str, Any]]:
+        """
+        Espera a que termine un lote de la Batch API y procesa sus resultados.
+        
+        Args:
+            batch_id: Identificador del lote
+            poll_interval: Segundos entre consultas del estado del lote
             
-            # Realizar llamada a la API
-            response = self._call_api(prompt)
+        Returns:
+            Diccionario nombre del paper -> análisis, solo para las peticiones exitosas
             
-            # Procesar la respuesta
-            chunk_result = self._process_response(response, f"{paper_name}_chunk_{i+1}")
-            chunk_results.append(chunk_result)
+        Raises:
+            RuntimeError: Si el lote falla, expira o se cancela
+        """
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise RuntimeError(f"El lote {batch_id} terminó con estado {batch.status}")
+            
+            logger.info(f"Lote {batch_id} en estado {batch.status}, esperando {poll_interval} segundos...")
+            time.sleep(poll_interval)
+        
+        analyses = {}
+        if batch.output_file_id:
+            output = self.client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                
+                item = orjson.loads(line)
+                paper_name = item["custom_id"]
+                response = item.get("response") or {}
+                if response.get("status_code") != 200:
+                    logger.error(f"Error en el lote para {paper_name}: {item.get('error') or response.get('body')}")
+                    continue
+                
+                content = response["body"]["choices"][0]["message"]["content"]
+                analyses[paper_name] = self._process_response(_completion_from_content(content), paper_name)
+        
+        if batch.error_file_id:
+            logger.error(f"El lote {batch_id} tiene peticiones con errores (archivo {batch.error_file_id})")
+        
+        return analyses
+    
+    def analyze_paper_in_chunks(self, chunks: List[Dict[str, Any]], paper_name: str) -> Dict[str, Any]:
+        """
+        Analiza un paper dividido en chunks y consolida los resultados.
+        
+        Args:
+            chunks: Lista de chunks con texto y metadatos
+            paper_name: Nombre del paper
             
-            # Pausa corta para evitar rate limits
-            time.sleep(1)
+        Returns:
+            Diccionario con el análisis consolidado
+        """
+        logger.info(f"Analizando paper en {len(chunks)} chunks: {paper_name}")
+        
+        # Los chunks son independientes hasta la consolidación, así que se analizan
+        # en paralelo; el semáforo de la API limita las llamadas simultáneas.
+        # executor.map conserva el orden original de los chunks.
+        total_chunks = len(chunks)
+        with ThreadPoolExecutor(max_workers=max(1, min(total_chunks, MAX_CHUNK_WORKERS))) as executor:
+            chunk_results = list(executor.map(
+                lambda indexed_chunk: self._analyze_chunk(*indexed_chunk, total_chunks, paper_name),
+                enumerate(chunks)
+            ))
         
         # Solicitar un resumen final consolidado
         consolidation_result = self._request_consolidation(chunk_results, paper_name)
         
         return consolidation_result
+    
+    def _analyze_chunk(self, i: int, chunk: Dict[str, Any], total_chunks: int, paper_name: str) -> Dict[str, Any]:
+        """
+        Analiza un chunk individual de un paper.
+        
+        Args:
+            i: Posición del chunk (empezando en 0)
+            chunk: Chunk con texto y metadatos
+            total_chunks: Número total de chunks del paper
+            paper_name: Nombre del paper
+            
+        Returns:
+            Diccionario con el análisis parcial del chunk
+        """
+        chunk_text = chunk['text']
+        chunk_metadata = chunk['metadata']
+        
+        # Adaptar el prompt para indicar que es parte de un documento mayor
+        section_info = chunk_metadata.get('section', 'texto')
+        part_info = chunk_metadata.get('chunk_part', '')
+        chunk_info = f"Parte {i+1}/{total_chunks} - Sección: {section_info}"
+        if part_info:
+            chunk_info += f" (Parte {part_info})"
+        
+        logger.info(f"Procesando {chunk_info}")
+        
+        # Usar un prompt específico para chunks
+        if i == 0:
+            # El primer chunk incluye instrucciones de inicio
+            prompt = get_chunk_initial_prompt(chunk_text, chunk_info)
+        elif i == total_chunks - 1:
+            # El último chunk incluye instrucciones de finalización/resumen
+            prompt = get_chunk_final_prompt(chunk_text, chunk_info)
+        else:
+            # Chunks intermedios
+            prompt = get_chunk_middle_prompt(chunk_text, chunk_info)
+        
+        # Truncar el prompt si es necesario
+        prompt = self._truncate_prompt(prompt)
+        
+        # Realizar llamada a la API
+        response = self._call_api(prompt)
+        
+        # Procesar la respuesta
+        return self._process_response(response, f"{paper_name}_chunk_{i+1}")
 
     def _request_consolidation(self, chunk_results: List[Dict[str, Any]], paper_name: str) -> Dict[str, Any]:
         """
@@ -177,52 +834,81 @@ class OpenAIClient:
         """
         Trunca el prompt para asegurarse de que está dentro de los límites del modelo.
         
+        El límite se mide en tokens, igual que las ventanas de split_token_windows:
+        un límite en caracteres recortaría las ventanas de los textos con más de
+        CHARS_PER_TOKEN caracteres por token.
+        
         Args:
             prompt: El prompt original
             
         Returns:
             El prompt truncado
         """
-        # Estimar límite de caracteres para prompt (considerando que ~4 caracteres = 1 token)
-        # Reservar espacio para 1500 tokens de respuesta (6,000 caracteres aprox.)
-        # El total no debe exceder ~8,000 tokens, así que permitimos ~6,500 tokens para el prompt
-        max_prompt_chars = 6500 * 4  # ~26,000 caracteres
-        
-        if len(prompt) <= max_prompt_chars:
+        # Un token ocupa al menos un caracter, así que los prompts cortos no se tokenizan
+        if len(prompt) <= self.prompt_token_limit or count_tokens(prompt, self.model) <= self.prompt_token_limit:
             return prompt
             
         logger.warning(f"Prompt demasiado largo ({len(prompt)} caracteres). Truncando...")
         
-        # Encontrar las secciones del prompt
-        prompt_parts = prompt.split("-----")
+        # Encontrar las secciones del prompt: instrucciones, contenido del paper y
+        # cierre (el contenido puede contener el separador)
+        intro, separator, rest = prompt.partition(PROMPT_SEPARATOR)
+        paper_content, closing_separator, outro = rest.rpartition(PROMPT_SEPARATOR)
         
-        if len(prompt_parts) < 3:
+        if not separator or not closing_separator:
             # Si no podemos identificar la estructura, truncamos simplemente
-            return prompt[:max_prompt_chars]
-        
-        # Mantener la introducción y las instrucciones finales
-        intro = prompt_parts[0]
-        paper_content = prompt_parts[1]
-        outro = prompt_parts[2]
+            return split_token_windows(prompt, self.model, self.prompt_token_limit)[0]
         
         # Calcular cuánto espacio tenemos para el contenido del paper
-        available_chars = max_prompt_chars - len(intro) - len(outro) - 10  # 10 para los separadores
+        truncation_marker = "... [texto truncado]"
+        available_tokens = self.prompt_token_limit - count_tokens(
+            intro + PROMPT_SEPARATOR + truncation_marker + PROMPT_SEPARATOR + outro, self.model
+        ) - 10  # 10 para las uniones entre partes
         
         # Truncar el contenido del paper
-        truncated_paper = paper_content[:available_chars] + "... [texto truncado]"
+        truncated_paper = split_token_windows(paper_content, self.model, max(1, available_tokens))[0] + truncation_marker
         
         # Reconstruir el prompt
-        truncated_prompt = intro + "-----" + truncated_paper + "-----" + outro
+        truncated_prompt = intro + PROMPT_SEPARATOR + truncated_paper + PROMPT_SEPARATOR + outro
         
         logger.debug(f"Prompt truncado a {len(truncated_prompt)} caracteres")
         return truncated_prompt
     
-    def _call_api(self, prompt: str) -> Dict[str, Any]:
+    def _build_request(self, prompt: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Construye los parámetros de una petición de chat completions.
+        
+        Args:
+            prompt: Texto del prompt
+            max_tokens: Tokens máximos de la respuesta (por defecto, los de un solo paper)
+            
+        Returns:
+            Diccionario con los parámetros de la petición
+        """
+        # Asegurarse de que max_tokens no exceda límites seguros
+        # Para GPT-4, reservar al menos 6,500 tokens para el input, dejando ~1,500 para output.
+        # Un valor explícito (lotes de papers) ya está dimensionado por plan_batches
+        safe_max_tokens = max_tokens or min(self.max_tokens, OUTPUT_TOKENS_PER_PAPER)
+        
+        request = {
+            "model": self.model,
+            "messages": [self._system_msg, {"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "max_tokens": safe_max_tokens,
+        }
+        
+        if self.json_mode:
+            request["response_format"] = {"type": "json_object"}
+        
+        return request
+    
+    def _call_api(self, prompt: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
         """
         Realiza una llamada a la API de OpenAI con reintentos.
         
         Args:
             prompt: Texto del prompt
+            max_tokens: Tokens máximos de la respuesta (por defecto, los de un solo paper)
             
         Returns:
             Respuesta de la API
@@ -230,33 +916,101 @@ class OpenAIClient:
         Raises:
             Exception: Si todos los reintentos fallan
         """
-        # Asegurarse de que max_tokens no exceda límites seguros
-        # Para GPT-4, reservar al menos 6,500 tokens para el input, dejando ~1,500 para output
-        safe_max_tokens = min(self.max_tokens, 1000)  # Más restrictivo para asegurar que funcione
+        # Consultar la caché antes de llamar a la API
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = ResponseCache.make_key(self.model, self.temperature, prompt)
+            cached_content = self.response_cache.get(cache_key)
+            if cached_content is not None:
+                logger.debug("Respuesta obtenida de la caché")
+                return _completion_from_content(cached_content)
+        
+        request = self._build_request(prompt, max_tokens)
+        estimated_tokens = len(prompt) // CHARS_PER_TOKEN + request["max_tokens"]
+        
+        completion = self._request_with_retries(
+            self.client.chat.completions.with_raw_response.create, request, estimated_tokens
+        )
+        
+        # Guardar en caché solo las respuestas que se pueden interpretar;
+        # una respuesta inválida se volvería a servir en cada ejecución
+        content = completion.choices[0].message.content
+        if cache_key is not None and content:
+            try:
+                _parse_json(_json_payload(content))
+            except ValueError as e:
+                logger.debug(f"Respuesta no guardada en caché (JSON inválido): {e}")
+            else:
+                self.response_cache.set(cache_key, content)
         
+        return completion
+    
+    def _request_with_retries(self, create: Any, request: Dict[str, Any], estimated_tokens: int) -> Any:
+        """
+        Envía una petición a la API respetando el límite de peticiones y con reintentos.
+        
+        Args:
+            create: Método with_raw_response.create del endpoint
+            request: Parámetros de la petición
+            estimated_tokens: Tokens estimados de la petición (para el limitador)
+            
+        Returns:
+            Respuesta de la API ya interpretada
+            
+        Raises:
+            Exception: Si el error no es recuperable o todos los reintentos fallan
+        """
         for attempt in range(self.max_retries):
             try:
                 logger.debug(f"Intentando llamada a API (intento {attempt + 1}/{self.max_retries})")
                 
-                completion = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "Eres un asistente especializado en analizar papers académicos."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=self.temperature,
-                    max_tokens=safe_max_tokens
-                )
+                _RATE_LIMITER.acquire(estimated_tokens)
+                with _API_SEMAPHORE:
+                    raw_response = create(**request)
                 
-                return completion
+                _RATE_LIMITER.update(raw_response.headers)
+                return raw_response.parse()
                 
             except Exception as e:
-                logger.warning(f"Error en llamada a API: {e}. Reintentando en {self.retry_delay} segundos...")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-                else:
+                if not _is_retryable(e):
+                    # Errores no recuperables: reintentar no cambiaría el resultado
+                    logger.error(f"Error no recuperable en llamada a API: {e}")
+                    raise
+                
+                if attempt >= self.max_retries - 1:
                     logger.error(f"Máximo de reintentos alcanzado: {e}")
                     raise
+                
+                delay = self._get_retry_delay(e, attempt)
+                logger.warning(f"Error en llamada a API: {e}. Reintentando en {delay:.1f} segundos...")
+                time.sleep(delay)
+    
+    def _get_retry_delay(self, error: Exception, attempt: int) -> float:
+        """
+        Calcula la espera antes del siguiente reintento.
+        
+        Si la API indica cuánto esperar (cabecera Retry-After) se respeta ese valor;
+        en caso contrario se aplica backoff exponencial con jitter completo, para
+        que los hilos que fallan a la vez no reintenten sincronizados.
+        
+        Args:
+            error: Excepción producida en la llamada
+            attempt: Número de intento (empezando en 0)
+            
+        Returns:
+            Segundos de espera
+        """
+        from openai import APIStatusError
+        
+        if isinstance(error, APIStatusError):
+            retry_after = error.response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(MAX_RETRY_DELAY, max(0.0, float(retry_after)))
+                except ValueError:
+                    logger.debug(f"Cabecera Retry-After no numérica: {retry_after}")
+        
+        return min(MAX_RETRY_DELAY, self.retry_delay * 2 ** attempt) * random.random()
     
     def _process_response(self, response: Dict[str, Any], paper_name: str) -> Dict[str, Any]:
         """
@@ -275,15 +1029,15 @@ class OpenAIClient:
             
             # Intentar parsearlo como JSON
             try:
-                # Buscar contenido JSON en la respuesta, si está envuelto en ```json ... ```
-                json_match = content
-                if "```json" in content:
-                    json_match = content.split("```json")[1].split("```")[0].strip()
-                elif "```" in content:
-                    json_match = content.split("```")[1].split("```")[0].strip()
+                if self.json_mode:
+                    # La API ya devuelve un objeto JSON sin texto adicional
+                    json_match = content
+                else:
+                    # Buscar contenido JSON en la respuesta, si está envuelto en ```json ... ```
+                    json_match = _json_payload(content)
                 
                 # Parsear el JSON
-                analysis = json.loads(json_match)
+                analysis = _parse_json(json_match)
                 
                 # Asegurar que el nombre del paper esté incluido
                 if "nombre" not in analysis or not analysis["nombre"]:
@@ -316,6 +1070,23 @@ class OpenAIClient:
                 "performance": "No disponible"
             }
 
+@lru_cache(maxsize=8)
+def _get_client(model: str, temperature: float) -> OpenAIClient:
+    """
+    Devuelve un cliente compartido para la combinación de modelo y temperatura.
+    
+    Reutilizar el cliente mantiene abiertas las conexiones HTTP con la API
+    entre papers en lugar de negociar una nueva conexión TLS en cada uno.
+    
+    Args:
+        model: Modelo de OpenAI
+        temperature: Temperatura para generación
+        
+    Returns:
+        Instancia de OpenAIClient
+    """
+    return OpenAIClient(model=model, temperature=temperature)
+
 # Función de conveniencia
 def analyze_paper(paper_text: str, paper_name: str, 
                  model: str = "gpt-4", 
@@ -332,8 +1103,71 @@ def analyze_paper(paper_text: str, paper_name: str,
     Returns:
         Diccionario con el análisis
     """
-    client = OpenAIClient(model=model, temperature=temperature)
-    return client.analyze_paper(paper_text, paper_name)
+    return _get_client(model, temperature).analyze_paper(paper_text, paper_name)
+
+# Funciones de conveniencia para análisis por lotes
+def plan_paper_batches(papers: List[Tuple[str, str]],
+                       model: str = "gpt-4",
+                       temperature: float = 0.2) -> List[List[Tuple[str, str]]]:
+    """
+    Función auxiliar para agrupar papers en lotes según el presupuesto de tokens.
+    
+    Args:
+        papers: Lista de tuplas (nombre del paper, texto del paper)
+        model: Modelo de OpenAI
+        temperature: Temperatura para generación
+        
+    Returns:
+        Lista de lotes de papers
+    """
+    return _get_client(model, temperature).plan_batches(papers)
+
+def create_batch_planner(model: str = "gpt-4", temperature: float = 0.2) -> BatchPlanner:
+    """
+    Función auxiliar para crear un planificador de lotes incremental.
+    
+    Args:
+        model: Modelo de OpenAI
+        temperature: Temperatura para generación
+        
+    Returns:
+        Instancia de BatchPlanner vacía
+    """
+    return _get_client(model, temperature).batch_planner()
+
+def analyze_papers_batch(papers: List[Tuple[str, str]],
+                         model: str = "gpt-4",
+                         temperature: float = 0.2) -> Dict[str, Dict[str, Any]]:
+    """
+    Función auxiliar para analizar un lote de papers en una sola petición.
+    
+    Args:
+        papers: Lista de tuplas (nombre del paper, texto del paper)
+        model: Modelo de OpenAI
+        temperature: Temperatura para generación
+        
+    Returns:
+        Diccionario nombre del paper -> análisis
+    """
+    return _get_client(model, temperature).analyze_papers_batch(papers)
+
+def analyze_papers_with_batch_api(papers: List[Tuple[str, str]],
+                                  model: str = "gpt-4",
+                                  temperature: float = 0.2) -> Dict[str, Dict[str, Any]]:
+    """
+    Función auxiliar para analizar papers con la Batch API y esperar el resultado.
+    
+    Args:
+        papers: Lista de tuplas (nombre del paper, texto del paper)
+        model: Modelo de OpenAI
+        temperature: Temperatura para generación
+        
+    Returns:
+        Diccionario nombre del paper -> análisis
+    """
+    client = _get_client(model, temperature)
+    batch_id = client.submit_batch(papers)
+    return client.wait_for_batch(batch_id)
 
 # Función de conveniencia para análisis por chunks
 def analyze_paper_chunks(chunks: List[Dict[str, Any]], paper_name: str,
@@ -351,5 +1185,4 @@ def analyze_paper_chunks(chunks: List[Dict[str, Any]], paper_name: str,
     Returns:
         Diccionario con el análisis consolidado
     """
-    client = OpenAIClient(model=model, temperature=temperature)
-    return client.analyze_paper_in_chunks(chunks, paper_name)
\ No newline at end of file
+    return _get_client(model, temperature).analyze_paper_in_chunks(chunks, paper_name)
\ No newline at end of file
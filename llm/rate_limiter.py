@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Limitador de peticiones basado en las cabeceras de rate limit de la API de OpenAI.
+"""
+
+import re
+import time
+import logging
+import threading
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Duraciones de las cabeceras x-ratelimit-reset-* (p. ej. "1s", "6m0s", "20ms")
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+# Espera máxima ante un presupuesto agotado (segundos)
+MAX_RATE_LIMIT_WAIT = 60
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Convierte una duración de las cabeceras de rate limit a segundos.
+    
+    Args:
+        value: Duración en el formato de la API (p. ej. "6m0s")
+    
+    Returns:
+        Segundos, o None si no se pudo interpretar
+    """
+    if not value:
+        return None
+    
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+class RateLimiter:
+    """
+    Limitador compartido entre hilos que respeta el presupuesto de peticiones y
+    tokens que la API informa en cada respuesta.
+    
+    Tras cada respuesta se actualiza el presupuesto restante con las cabeceras
+    x-ratelimit-remaining-* y x-ratelimit-reset-*. Antes de cada petición se
+    descuenta su coste estimado; si el presupuesto se agotó, se espera hasta
+    que la API indique que se renueva.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._remaining_requests: Optional[int] = None
+        self._remaining_tokens: Optional[int] = None
+        self._requests_reset_at = 0.0
+        self._tokens_reset_at = 0.0
+        # Instante hasta el que todas las peticiones deben esperar (0 si no hay bloqueo)
+        self._blocked_until = 0.0
+    
+    def acquire(self, tokens: int) -> None:
+        """
+        Reserva presupuesto para una petición, esperando si es necesario.
+        
+        Cuando el presupuesto se agota se fija un plazo compartido: todos los
+        hilos que lleguen antes de que venza esperan hasta él, no solo el
+        primero. Al vencer se da el presupuesto por renovado.
+        
+        Args:
+            tokens: Tokens estimados de la petición (entrada y salida)
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                
+                if self._blocked_until and now >= self._blocked_until:
+                    # El plazo venció: el presupuesto se habrá renovado, pero se
+                    # desconoce hasta la próxima respuesta
+                    self._blocked_until = 0.0
+                    self._remaining_requests = None
+                    self._remaining_tokens = None
+                
+                if not self._blocked_until:
+                    wait_until = now
+                    if self._remaining_requests is not None and self._remaining_requests <= 0:
+                        wait_until = max(wait_until, self._requests_reset_at)
+                    if self._remaining_tokens is not None and self._remaining_tokens < tokens:
+                        wait_until = max(wait_until, self._tokens_reset_at)
+                    
+                    if wait_until <= now:
+                        if self._remaining_requests is not None:
+                            self._remaining_requests -= 1
+                        if self._remaining_tokens is not None:
+                            self._remaining_tokens -= tokens
+                        return
+                    
+                    self._blocked_until = min(wait_until, now + MAX_RATE_LIMIT_WAIT)
+                
+                delay = self._blocked_until - now
+            
+            logger.info(f"Presupuesto de la API agotado, esperando {delay:.1f} segundos...")
+            time.sleep(delay)
+    
+    def update(self, headers: Mapping[str, str]) -> None:
+        """
+        Actualiza el presupuesto restante a partir de las cabeceras de una respuesta.
+        
+        Args:
+            headers: Cabeceras HTTP de la respuesta
+        """
+        now = time.monotonic()
+        
+        with self._lock:
+            remaining_requests = headers.get("x-ratelimit-remaining-requests")
+            if remaining_requests is not None and remaining_requests.isdigit():
+                self._remaining_requests = int(remaining_requests)
+                reset = parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+                self._requests_reset_at = now + (reset or 0)
+            
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if remaining_tokens is not None and remaining_tokens.isdigit():
+                self._remaining_tokens = int(remaining_tokens)
+                reset = parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+                self._tokens_reset_at = now + (reset or 0)
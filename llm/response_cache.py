@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Caché persistente de respuestas del LLM.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+import orjson
+
+from config.settings import LLM_CONFIG, OUTPUT_DIR
+
+logger = logging.getLogger(__name__)
+
+# Directorio donde se guardan las cachés del LLM
+CACHE_DIR = os.path.join(OUTPUT_DIR, ".llm_cache")
+
+# Tiempo de vida por defecto de una respuesta en caché (segundos)
+DEFAULT_TTL = 30 * 86400
+
+# Tiempo de vida por defecto de un análisis en la caché semántica (segundos)
+DEFAULT_SEMANTIC_TTL = 7 * 86400
+
+# Similitud coseno mínima para considerar que dos papers son casi idénticos
+DEFAULT_SIMILARITY_THRESHOLD = 0.97
+
+# Diferencia relativa máxima de longitud entre dos textos casi idénticos
+MAX_LENGTH_DIFFERENCE = 0.05
+
+# Filas reservadas inicialmente en el archivo de embeddings de la caché semántica
+MIN_SEMANTIC_CAPACITY = 256
+
+class ResponseCache:
+    """Caché de respuestas del LLM respaldada por SQLite, indexada por el hash del prompt."""
+    
+    def __init__(self, path: str, ttl: int = DEFAULT_TTL):
+        """
+        Inicializa la caché.
+        
+        Args:
+            path: Ruta al archivo SQLite
+            ttl: Tiempo de vida de cada respuesta (segundos)
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        self.path = path
+        self.ttl = ttl
+        
+        # Una sola conexión compartida entre hilos, serializada con un lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, content TEXT NOT NULL, expires_at INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt: str) -> str:
+        """
+        Calcula la clave de caché de una petición.
+        
+        Args:
+            model: Modelo de OpenAI
+            temperature: Temperatura para la generación
+            prompt: Texto del prompt
+        
+        Returns:
+            Clave en hexadecimal
+        """
+        return hashlib.blake2b(f"{model}|{temperature}|{prompt}".encode(), digest_size=16).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Obtiene una respuesta de la caché.
+        
+        Args:
+            key: Clave de la petición
+        
+        Returns:
+            Contenido de la respuesta, o None si no existe o expiró
+        """
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT content FROM responses WHERE key = ? AND expires_at > ?",
+                    (key, int(time.time()))
+                ).fetchone()
+            return row[0] if row else None
+        
+        except sqlite3.Error as e:
+            logger.warning(f"Error al leer la caché de respuestas: {e}")
+            return None
+    
+    def set(self, key: str, content: str) -> None:
+        """
+        Guarda una respuesta en la caché.
+        
+        Args:
+            key: Clave de la petición
+            content: Contenido de la respuesta
+        """
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, content, expires_at) VALUES (?, ?, ?)",
+                    (key, content, int(time.time()) + self.ttl)
+                )
+                self._conn.commit()
+        
+        except sqlite3.Error as e:
+            logger.warning(f"Error al escribir en la caché de respuestas: {e}")
+
+@lru_cache(maxsize=1)
+def get_response_cache() -> ResponseCache:
+    """Devuelve la caché de respuestas compartida por todos los clientes."""
+    return ResponseCache(os.path.join(CACHE_DIR, "responses.sqlite3"))
+
+class SemanticCache:
+    """
+    Caché de análisis de papers por similitud semántica.
+    
+    Cada entrada guarda el hash SHA-256 del texto, su embedding y el análisis
+    resultante. Una búsqueda exacta por hash evita incluso el cálculo del
+    embedding; si no hay coincidencia exacta se busca el embedding más
+    parecido con un producto matricial sobre los embeddings normalizados. Solo
+    se aceptan casi duplicados (p. ej. otra versión del mismo paper): similitud
+    alta y longitud de texto parecida. Cada análisis pertenece a un espacio de
+    nombres (modelo, temperatura y versión de las plantillas de prompt): la
+    búsqueda exacta lo incluye en el hash y la búsqueda por similitud solo
+    considera las entradas del mismo espacio.
+    
+    Los embeddings se guardan normalizados en un archivo float32 contiguo que se
+    abre con np.memmap, de modo que cargar la caché no requiere leer ni copiar
+    las filas de SQLite; la tabla embedding_rows asocia cada fila con su hash.
+    El archivo se reserva con capacidad de sobra (se duplica al agotarse), así
+    que añadir una fila solo la escribe en su posición, sin volver a mapear el
+    archivo ni copiar la matriz.
+    """
+    
+    def __init__(self, path: str, ttl: int = DEFAULT_SEMANTIC_TTL,
+                 threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        """
+        Inicializa la caché y mapea en memoria los embeddings guardados.
+        
+        Args:
+            path: Ruta al archivo SQLite
+            ttl: Tiempo de vida de cada análisis (segundos)
+            threshold: Similitud coseno mínima para devolver un análisis
+        """
+        import numpy as np
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        self.path = path
+        self.embeddings_path = f"{os.path.splitext(path)[0]}.embeddings.f32"
+        self.ttl = ttl
+        self.threshold = threshold
+        self._np = np
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS semantic ("
+            "hash TEXT PRIMARY KEY, embedding BLOB, response TEXT NOT NULL, "
+            "created_at INTEGER NOT NULL, expires_at INTEGER NOT NULL, text_length INTEGER, namespace TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(semantic)")}
+        for column in ("text_length INTEGER", "namespace TEXT"):
+            if column.split()[0] not in columns:
+                self._conn.execute(f"ALTER TABLE semantic ADD COLUMN {column}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embedding_rows (row INTEGER PRIMARY KEY, hash TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+        
+        # Matriz de embeddings normalizados (memmap), con sus hashes, fechas de
+        # expiración, longitudes de texto y espacios de nombres (como índice en
+        # _namespace_ids) alineados por fila; solo las primeras len(_hashes)
+        # filas están ocupadas
+        self._hashes: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._namespace_ids: Dict[str, int] = {}
+        self._embeddings = None
+        self._expires = None
+        self._lengths = None
+        self._namespaces = None
+        self._capacity = 0
+        self._dim: Optional[int] = None
+        self._load_embeddings()
+    
+    @staticmethod
+    def hash_text(text: str, namespace: str = "") -> str:
+        """
+        Calcula el hash exacto de un texto dentro de un espacio de nombres.
+        
+        Args:
+            text: Texto del paper
+            namespace: Espacio de nombres del análisis (modelo, temperatura y
+                versión de las plantillas de prompt)
+            
+        Returns:
+            Hash SHA-256 en hexadecimal
+        """
+        return hashlib.sha256(f"{namespace}\0{text}".encode()).hexdigest()
+    
+    def _namespace_id(self, namespace: str) -> int:
+        """Devuelve el índice numérico de un espacio de nombres, asignándolo si es nuevo."""
+        return self._namespace_ids.setdefault(namespace, len(self._namespace_ids))
+    
+    def _normalize(self, embedding: Sequence[float]) -> Any:
+        """Convierte un embedding en un vector float32 de norma 1."""
+        vector = self._np.asarray(embedding, dtype=self._np.float32)
+        norm = self._np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def _reserve(self, rows: int) -> None:
+        """
+        Garantiza espacio para al menos rows filas en el archivo de embeddings y
+        en los arrays por fila, duplicando la capacidad cuando se agota.
+        
+        Args:
+            rows: Número de filas necesarias
+        """
+        if rows <= self._capacity:
+            return
+        
+        capacity = max(rows, 2 * self._capacity, MIN_SEMANTIC_CAPACITY)
+        with open(self.embeddings_path, 'ab') as f:
+            f.truncate(capacity * self._dim * 4)
+        self._embeddings = self._np.memmap(
+            self.embeddings_path, dtype=self._np.float32, mode='r+', shape=(capacity, self._dim)
+        )
+        
+        used = len(self._hashes)
+        expires = self._np.zeros(capacity, dtype=self._np.int64)
+        lengths = self._np.zeros(capacity, dtype=self._np.int64)
+        namespaces = self._np.full(capacity, -1, dtype=self._np.int32)
+        if self._expires is not None:
+            expires[:used] = self._expires[:used]
+            lengths[:used] = self._lengths[:used]
+            namespaces[:used] = self._namespaces[:used]
+        self._expires = expires
+        self._lengths = lengths
+        self._namespaces = namespaces
+        self._capacity = capacity
+    
+    def _migrate_blob_embeddings(self) -> None:
+        """Pasa al archivo de embeddings los guardados como BLOB por versiones anteriores."""
+        rows = self._conn.execute(
+            "SELECT hash, embedding FROM semantic WHERE embedding IS NOT NULL"
+        ).fetchall()
+        if not rows:
+            return
+        
+        dim = len(rows[0][1]) // 4
+        rows = [row for row in rows if len(row[1]) == dim * 4]
+        
+        with open(self.embeddings_path, 'wb') as f:
+            for _, blob in rows:
+                f.write(blob)
+        
+        self._conn.executemany(
+            "INSERT INTO embedding_rows (row, hash) VALUES (?, ?)",
+            [(i, row[0]) for i, row in enumerate(rows)]
+        )
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+        self._conn.execute("UPDATE semantic SET embedding = NULL")
+        self._conn.commit()
+        logger.info(f"Caché semántica migrada: {len(rows)} embeddings")
+    
+    def _load_embeddings(self) -> None:
+        """Mapea los embeddings guardados y carga la expiración, la longitud y el espacio de nombres de cada uno."""
+        try:
+            if not self._conn.execute("SELECT 1 FROM embedding_rows LIMIT 1").fetchone():
+                self._migrate_blob_embeddings()
+            
+            dim = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+            rows = self._conn.execute(
+                "SELECT e.hash, COALESCE(s.expires_at, 0), COALESCE(s.text_length, 0), s.namespace "
+                "FROM embedding_rows e "
+                "LEFT JOIN semantic s ON s.hash = e.hash ORDER BY e.row"
+            ).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Error al cargar la caché semántica: {e}")
+            return
+        
+        self._dim = int(dim[0]) if dim else None
+        
+        # Descartar las filas que no llegaron al archivo (p. ej. tras una escritura
+        # interrumpida); lo que sobra al final del archivo es capacidad reservada
+        try:
+            size = os.path.getsize(self.embeddings_path)
+        except OSError:
+            size = 0
+        
+        rows = rows[:size // (self._dim * 4)] if self._dim else []
+        
+        try:
+            self._conn.execute("DELETE FROM embedding_rows WHERE row >= ?", (len(rows),))
+            self._conn.commit()
+            if not rows:
+                return
+            self._reserve(len(rows))
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Error al reparar la caché semántica: {e}")
+            return
+        
+        self._hashes = [row[0] for row in rows]
+        self._rows = {text_hash: i for i, text_hash in enumerate(self._hashes)}
+        self._expires[:len(rows)] = [row[1] for row in rows]
+        self._lengths[:len(rows)] = [row[2] for row in rows]
+        # Las entradas sin espacio de nombres (versiones anteriores) no coinciden con ninguno
+        self._namespaces[:len(rows)] = [
+            -1 if row[3] is None else self._namespace_id(row[3]) for row in rows
+        ]
+        logger.debug(f"Caché semántica cargada con {len(self._hashes)} entradas")
+    
+    def _get_response(self, text_hash: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el análisis vigente asociado a un hash."""
+        row = self._conn.execute(
+            "SELECT response FROM semantic WHERE hash = ? AND expires_at > ?",
+            (text_hash, int(time.time()))
+        ).fetchone()
+        return orjson.loads(row[0]) if row else None
+    
+    def get_exact(self, text_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca un análisis por coincidencia exacta del texto.
+        
+        Args:
+            text_hash: Hash del texto (ver hash_text)
+            
+        Returns:
+            Análisis guardado, o None si no existe o expiró
+        """
+        try:
+            with self._lock:
+                return self._get_response(text_hash)
+        
+        except (sqlite3.Error, orjson.JSONDecodeError) as e:
+            logger.warning(f"Error al leer la caché semántica: {e}")
+            return None
+    
+    def get_similar(self, embedding: Sequence[float], text_length: int,
+                    namespace: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Busca el análisis de un paper casi idéntico.
+        
+        Args:
+            embedding: Embedding del texto del paper
+            text_length: Longitud del texto del paper
+            namespace: Espacio de nombres del análisis (ver hash_text)
+            
+        Returns:
+            Análisis guardado si la similitud supera el umbral y la longitud del
+            texto es parecida, None en caso contrario
+        """
+        try:
+            with self._lock:
+                rows = len(self._hashes)
+                namespace_id = self._namespace_ids.get(namespace)
+                if not rows or namespace_id is None:
+                    return None
+                
+                query = self._normalize(embedding)
+                if query.shape[0] != self._dim:
+                    return None
+                
+                # Las entradas caducadas (también las que expiraron durante la
+                # ejecución), las de otro espacio de nombres y las de longitud
+                # distinta se descartan antes de elegir la más parecida
+                similarities = self._embeddings[:rows] @ query
+                similarities[self._expires[:rows] <= time.time()] = -1.0
+                similarities[self._namespaces[:rows] != namespace_id] = -1.0
+                length_difference = self._np.abs(self._lengths[:rows] - text_length)
+                similarities[length_difference > MAX_LENGTH_DIFFERENCE * max(text_length, 1)] = -1.0
+                best = int(similarities.argmax())
+                if similarities[best] < self.threshold:
+                    return None
+                
+                logger.debug(f"Coincidencia semántica con similitud {similarities[best]:.3f}")
+                return self._get_response(self._hashes[best])
+        
+        except (sqlite3.Error, orjson.JSONDecodeError) as e:
+            logger.warning(f"Error al leer la caché semántica: {e}")
+            return None
+    
+    def add(self, text_hash: str, embedding: Optional[Sequence[float]], response: Dict[str, Any],
+            text_length: int, namespace: str = "") -> None:
+        """
+        Guarda el análisis de un paper.
+        
+        Args:
+            text_hash: Hash del texto (ver hash_text)
+            embedding: Embedding del texto, o None si no está disponible
+            response: Análisis del paper
+            text_length: Longitud del texto del paper
+            namespace: Espacio de nombres del análisis (ver hash_text)
+        """
+        vector = self._normalize(embedding) if embedding is not None else None
+        now = int(time.time())
+        
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO semantic "
+                    "(hash, embedding, response, created_at, expires_at, text_length, namespace) "
+                    "VALUES (?, NULL, ?, ?, ?, ?, ?)",
+                    (text_hash, orjson.dumps(response).decode(), now, now + self.ttl, text_length, namespace)
+                )
+                
+                if vector is not None and self._dim is None:
+                    self._dim = vector.shape[0]
+                    self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(self._dim),))
+                
+                if vector is None or vector.shape[0] != self._dim:
+                    self._conn.commit()
+                    return
+                
+                if text_hash in self._rows:
+                    # El embedding ya está guardado; la entrada vuelve a estar vigente
+                    self._conn.commit()
+                    self._expires[self._rows[text_hash]] = now + self.ttl
+                    self._lengths[self._rows[text_hash]] = text_length
+                    self._namespaces[self._rows[text_hash]] = self._namespace_id(namespace)
+                    return
+                
+                # Escribir la fila a continuación de las ocupadas
+                row = len(self._hashes)
+                self._reserve(row + 1)
+                self._embeddings[row] = vector
+                self._conn.execute("INSERT INTO embedding_rows (row, hash) VALUES (?, ?)", (row, text_hash))
+                self._conn.commit()
+                
+                self._rows[text_hash] = row
+                self._hashes.append(text_hash)
+                self._expires[row] = now + self.ttl
+                self._lengths[row] = text_length
+                self._namespaces[row] = self._namespace_id(namespace)
+        
+        except (sqlite3.Error, OSError, orjson.JSONEncodeError) as e:
+            logger.warning(f"Error al escribir en la caché semántica: {e}")
+
+@lru_cache(maxsize=1)
+def get_semantic_cache() -> SemanticCache:
+    """Devuelve la caché semántica compartida por todos los clientes."""
+    threshold = LLM_CONFIG.get("semantic_cache_threshold", DEFAULT_SIMILARITY_THRESHOLD)
+    return SemanticCache(os.path.join(CACHE_DIR, "semantic.sqlite3"), threshold=threshold)
\ No newline at end of file
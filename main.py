@@ -10,15 +10,10 @@ import os
 import sys
 import logging
 import argparse
-from dotenv import load_dotenv
 
-# Import de módulos propios
-from config.settings import configure_app, INPUT_DIR, OUTPUT_DIR
-from core.pipeline import run_pipeline, process_single_paper
-from processing.pdf_extractor import extract_text_from_pdf
-from processing.text_preprocessor import preprocess_text
-from llm.openai_client import analyze_paper
-from output.json_formatter import save_paper_analysis
+# Import de módulos propios (la configuración es ligera; el resto de módulos se
+# importan al usarlos para que la CLI arranque rápido, p. ej. con --help)
+from config.settings import configure_app, INPUT_DIR, OUTPUT_DIR, LLM_CONFIG
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -29,26 +24,47 @@ def parse_arguments():
     parser = argparse.ArgumentParser(description='Analiza papers de arXiv y genera resúmenes en JSON.')
     parser.add_argument('--pdf', help='Ruta a un archivo PDF específico para procesar')
     parser.add_argument('--process-all', action='store_true', help='Procesa todos los PDFs en el directorio de entrada')
+    parser.add_argument('--batch-api', action='store_true',
+                        help='Con --process-all, usa la Batch API de OpenAI (más barata, resultados en hasta 24h)')
+    parser.add_argument('--force', action='store_true',
+                        help='Con --process-all, reprocesa también los PDFs que ya tienen un resultado actualizado')
     parser.add_argument('--verbose', '-v', action='store_true', help='Activa el modo verbose para más detalles')
     
     return parser.parse_args()
 
+def stage_extract(pdf_path):
+    """
+    Extrae y preprocesa el texto de un PDF. Devuelve (nombre del paper, texto procesado).
+    Se ejecuta en un proceso aparte al procesar todos los PDFs (trabajo de CPU).
+    """
+    from processing.pdf_extractor import extract_text_from_pdf
+    from processing.text_preprocessor import preprocess_text
+    
+    # Obtener nombre de archivo para el resultado
+    paper_name = os.path.basename(pdf_path)
+    
+    # Extraer texto del PDF
+    text, metadata = extract_text_from_pdf(pdf_path)
+    logger.info(f"Texto extraído con éxito: {len(text)} caracteres")
+    logger.info(f"Metadatos extraídos: {metadata}")
+    
+    # Preprocesar el texto
+    logger.info("Preprocesando texto...")
+    processed_text = preprocess_text(text, metadata)
+    
+    return paper_name, processed_text
+
 def process_single_pdf(pdf_path):
     """Procesa un solo archivo PDF usando el pipeline completo."""
+    from input.file_manager import append_to_manifest, quick_hash
+    from llm.openai_client import analyze_paper
+    from output.json_formatter import save_paper_analysis
+    
     try:
         logger.info(f"Procesando archivo: {pdf_path}")
         
-        # Obtener nombre de archivo para el resultado
-        paper_name = os.path.basename(pdf_path)
-        
-        # Extraer texto del PDF
-        text, metadata = extract_text_from_pdf(pdf_path)
-        logger.info(f"Texto extraído con éxito: {len(text)} caracteres")
-        logger.info(f"Metadatos extraídos: {metadata}")
-        
-        # Preprocesar el texto
-        logger.info("Preprocesando texto...")
-        processed_text = preprocess_text(text, metadata)
+        file_hash = quick_hash(pdf_path)
+        paper_name, processed_text = stage_extract(pdf_path)
         
         # Enviar a OpenAI para análisis
         logger.info("Analizando con OpenAI...")
@@ -57,6 +73,7 @@ def process_single_pdf(pdf_path):
         # Formatear y guardar el resultado en JSON
         logger.info("Guardando resultado...")
         output_path = save_paper_analysis(analysis, paper_name, OUTPUT_DIR)
+        append_to_manifest(paper_name, file_hash, OUTPUT_DIR)
         
         logger.info(f"Procesamiento de {pdf_path} completado. Resultado guardado en {output_path}")
         return True
@@ -65,28 +82,154 @@ def process_single_pdf(pdf_path):
         logger.error(f"Error procesando {pdf_path}: {e}")
         return False
 
-def process_all_pdfs():
+def save_analyses(analyses, paper_names, file_hashes):
+    """
+    Guarda los análisis de los papers indicados y registra cada uno en el diario
+    de procesados con la huella de su PDF. Devuelve los nombres de los que se guardaron.
+    """
+    from input.file_manager import append_to_manifest
+    from output.json_formatter import save_paper_analysis
+    
+    saved = []
+    for paper_name in paper_names:
+        if paper_name not in analyses:
+            logger.error(f"No se obtuvo análisis para {paper_name}")
+            continue
+        
+        try:
+            output_path = save_paper_analysis(analyses[paper_name], paper_name, OUTPUT_DIR)
+            logger.info(f"Procesamiento de {paper_name} completado. Resultado guardado en {output_path}")
+            append_to_manifest(paper_name, file_hashes[paper_name], OUTPUT_DIR)
+            saved.append(paper_name)
+        except Exception as e:
+            logger.error(f"Error guardando el análisis de {paper_name}: {e}")
+    
+    return saved
+
+def stage_analyze_and_save(batch, file_hashes):
+    """
+    Analiza un lote de papers y guarda sus resultados. Devuelve los nombres de los que se guardaron.
+    Se ejecuta en un hilo aparte al procesar todos los PDFs (trabajo de E/S).
+    """
+    from llm.openai_client import analyze_papers_batch
+    
+    paper_names = [paper_name for paper_name, _ in batch]
+    try:
+        analyses = analyze_papers_batch(batch)
+    except Exception as e:
+        logger.error(f"Error analizando el lote {paper_names}: {e}")
+        return []
+    
+    return save_analyses(analyses, paper_names, file_hashes)
+
+def is_up_to_date(pdf_path, processed_mtimes, manifest):
+    """
+    Indica si el PDF ya tiene un JSON de resultado para su contenido actual.
+    Si el JSON es posterior a la última modificación del PDF no hace falta leerlo;
+    si no, se compara su huella con la del registro de procesados.
+    """
+    from input.file_manager import check_file_processed
+    
+    output_mtime = processed_mtimes.get(os.path.splitext(os.path.basename(pdf_path))[0])
+    if output_mtime is None:
+        return False
+    if output_mtime >= os.path.getmtime(pdf_path):
+        return True
+    return check_file_processed(pdf_path, manifest)
+
+def process_all_pdfs(use_batch_api=False, force=False):
     """Procesa todos los archivos PDF en el directorio de entrada."""
-    pdf_files = [f for f in os.listdir(INPUT_DIR) if f.lower().endswith('.pdf')]
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+    from input.file_manager import get_paper_files, get_processed_mtimes, load_manifest, quick_hash
+    from llm.openai_client import analyze_papers_with_batch_api, create_batch_planner
+    
+    pdf_files = get_paper_files()
     
     if not pdf_files:
         logger.warning(f"No se encontraron archivos PDF en {INPUT_DIR}")
         return
     
+    # Registro de papers procesados (nombre de archivo -> huella del PDF)
+    manifest = load_manifest(OUTPUT_DIR)
+    
+    # Omitir los PDFs cuyo JSON de resultado corresponde a su contenido actual
+    if not force:
+        processed_mtimes = get_processed_mtimes(OUTPUT_DIR)
+        pending_files = [pdf_path for pdf_path in pdf_files if not is_up_to_date(pdf_path, processed_mtimes, manifest)]
+        
+        skipped = len(pdf_files) - len(pending_files)
+        if skipped:
+            logger.info(f"Omitiendo {skipped} archivos PDF ya procesados (use --force para reprocesarlos)")
+        
+        pdf_files = pending_files
+        if not pdf_files:
+            logger.info("Todos los archivos PDF ya fueron procesados")
+            return
+    
     logger.info(f"Encontrados {len(pdf_files)} archivos PDF para procesar")
     
-    successful = 0
-    for pdf_file in pdf_files:
-        pdf_path = os.path.join(INPUT_DIR, pdf_file)
-        if process_single_pdf(pdf_path):
-            successful += 1
+    # Huella del contenido que se va a analizar; cada paper se registra en el
+    # diario de procesados en cuanto se guarda su resultado
+    file_hashes = {os.path.basename(pdf_path): quick_hash(pdf_path) for pdf_path in pdf_files}
+    
+    # La extracción (CPU) se reparte entre procesos y el análisis (E/S) entre hilos;
+    # cada lote se envía a la API en cuanto está completo, mientras se siguen
+    # extrayendo los demás PDFs
+    extract_workers = min(len(pdf_files), os.cpu_count() or 1)
+    analyze_workers = max(1, LLM_CONFIG.get("max_concurrent_requests", 4))
+    
+    papers = []
+    planner = create_batch_planner()
+    analyze_futures = []
+    saved = []
+    with ProcessPoolExecutor(max_workers=extract_workers) as extract_pool, \
+         ThreadPoolExecutor(max_workers=analyze_workers) as analyze_pool:
+        extract_futures = {
+            extract_pool.submit(stage_extract, pdf_path): pdf_path
+            for pdf_path in pdf_files
+        }
+        
+        for future in as_completed(extract_futures):
+            pdf_path = extract_futures[future]
+            try:
+                paper = future.result()
+                logger.info(f"Archivo extraído: {pdf_path}")
+            except Exception as e:
+                logger.error(f"Error procesando {pdf_path}: {e}")
+                continue
+            
+            papers.append(paper)
+            if use_batch_api:
+                continue
+            
+            # Enviar cada lote en cuanto se completa; el lote en curso puede admitir más papers
+            batch = planner.add(paper)
+            if batch:
+                analyze_futures.append(analyze_pool.submit(stage_analyze_and_save, batch, file_hashes))
+        
+        batch = planner.flush()
+        if batch:
+            analyze_futures.append(analyze_pool.submit(stage_analyze_and_save, batch, file_hashes))
+        
+        for future in as_completed(analyze_futures):
+            saved.extend(future.result())
+    
+    if not papers:
+        logger.warning("No se pudo extraer el texto de ningún PDF")
+    elif use_batch_api:
+        # Procesamiento diferido con la Batch API de OpenAI
+        try:
+            logger.info("Enviando papers a la Batch API de OpenAI...")
+            analyses = analyze_papers_with_batch_api(papers)
+            saved = save_analyses(analyses, [paper_name for paper_name, _ in papers], file_hashes)
+        except Exception as e:
+            logger.error(f"Error procesando el lote con la Batch API: {e}")
     
-    logger.info(f"Procesamiento completo: {successful} de {len(pdf_files)} archivos procesados con éxito")
+    logger.info(f"Procesamiento completo: {len(saved)} de {len(pdf_files)} archivos procesados con éxito")
 
 def main():
     """Función principal."""
-    # Cargar variables de entorno
-    load_dotenv()
+    # Las variables de entorno (.env) se cargan al importar config.settings
     
     # Parsear argumentos
     args = parse_arguments()
@@ -108,7 +251,7 @@ def main():
             logger.error(f"El archivo {args.pdf} no existe")
             sys.exit(1)
     elif args.process_all:
-        process_all_pdfs()
+        process_all_pdfs(use_batch_api=args.batch_api, force=args.force)
     else:
         logger.info("No se especificó ninguna acción. Use --pdf o --process-all")
         parser = argparse.ArgumentParser()
@@ -11,10 +11,30 @@ import logging
 from typing import Dict, Any, Union, Optional
 from datetime import datetime
 
+import orjson
+
 from config.settings import OUTPUT_DIR
 
 logger = logging.getLogger(__name__)
 
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """
+    Serializa un análisis como JSON indentado.
+    
+    orjson rechaza algunos valores que el módulo json sí admite (p. ej. enteros
+    de más de 64 bits que el LLM puede devolver); en ese caso se usa json.
+    
+    Args:
+        data: Diccionario a serializar
+        
+    Returns:
+        JSON codificado en UTF-8, terminado en salto de línea
+    """
+    try:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    except orjson.JSONEncodeError:
+        return (json.dumps(data, indent=2, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+
 def save_paper_analysis(analysis: Dict[str, Any], paper_name: str, output_dir: Optional[str] = None) -> str:
     """
     Guarda el análisis de un paper en un archivo JSON.
@@ -30,8 +50,9 @@ def save_paper_analysis(analysis: Dict[str, Any], paper_name: str, output_dir: O
     # Usar directorio por defecto si no se especifica
     output_dir = output_dir or OUTPUT_DIR
     
-    # Asegurar que el directorio exista
-    os.makedirs(output_dir, exist_ok=True)
+    # Asegurar que el directorio exista (sin llamar a makedirs en cada guardado)
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
     
     # Limpiar nombre para el archivo
     clean_name = os.path.splitext(os.path.basename(paper_name))[0]
@@ -49,9 +70,20 @@ def save_paper_analysis(analysis: Dict[str, Any], paper_name: str, output_dir: O
             }
         }
         
-        # Guardar en archivo
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(analysis_with_meta, f, indent=2, ensure_ascii=False)
+        # Guardar en un archivo temporal y reemplazar el destino de forma atómica,
+        # para que nunca quede un JSON a medio escribir
+        tmp_path = f"{output_path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(_dumps(analysis_with_meta))
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            # No dejar el archivo temporal si la escritura falla o se interrumpe
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
         
         logger.info(f"Análisis guardado en: {output_path}")
         return output_path
@@ -117,17 +149,25 @@ def merge_results(results_list: list[Dict[str, Any]]) -> Dict[str, Any]:
         Diccionario combinado
     """
     try:
-        # Inicializar diccionario combinado
+        # Inicializar diccionario combinado y los fragmentos de texto por clave
         combined = {}
+        text_parts = {}
         
         # Combinar todos los diccionarios
         for result in results_list:
             for key, value in result.items():
-                # Si la clave ya existe, concatenar valores de texto
-                if key in combined and isinstance(value, str) and isinstance(combined[key], str):
-                    combined[key] = f"{combined[key]}\n\n{value}"
+                # Si la clave ya tiene texto, acumular el fragmento para unirlo al final
+                parts = text_parts.get(key)
+                if parts is not None and isinstance(value, str):
+                    parts.append(value)
                 else:
                     combined[key] = value
+                    text_parts[key] = [value] if isinstance(value, str) else None
+        
+        # Unir los textos de cada clave una sola vez
+        for key, parts in text_parts.items():
+            if parts is not None and len(parts) > 1:
+                combined[key] = "\n\n".join(parts)
         
         return combined
         
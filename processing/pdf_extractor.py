@@ -8,23 +8,41 @@ Módulo para extracción de texto de archivos PDF.
 import os
 import re
 import logging
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterator, Tuple
 import PyPDF2
 
+from processing.section_detection import SectionMatcher
+from processing.text_cleaning import clean_text
+
+# Backend opcional basado en PDFium (mucho más rápido que PyPDF2); si no está
+# instalado se usa PyPDF2
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
 logger = logging.getLogger(__name__)
 
+# Expresiones regulares de metadatos, compiladas una sola vez
+_TITLE_RE = re.compile(r'^(.*?)\s*(?:Abstract|\.)', re.DOTALL)
+_ARXIV_PREFIX = 'arXiv:'
+_ARXIV_ID_RE = re.compile(r'\d+\.\d+v\d+')
+
+# Encabezados de sección, construidos una sola vez al importar el módulo
+_SECTIONS = SectionMatcher({
+    'abstract': (('abstract',), None),
+    'introduction': (('introduction',), r'1\.?\s+introduction'),
+    'methodology': (('methodology', 'method', 'approach'), r'2\.?\s+'),
+    'results': (('results', 'evaluation', 'experiment'), r'3\.?\s+'),
+    'conclusion': (('conclusion', 'discussion'), r'4\.?\s+'),
+    'references': (('references', 'bibliography'), None)
+})
+
 class PDFExtractor:
     """Clase para extraer y procesar texto de archivos PDF."""
     
     def __init__(self):
-        self.section_patterns = {
-            'abstract': re.compile(r'abstract', re.IGNORECASE),
-            'introduction': re.compile(r'introduction|1\.?\s+introduction', re.IGNORECASE),
-            'methodology': re.compile(r'methodology|method|approach|2\.?\s+', re.IGNORECASE),
-            'results': re.compile(r'results|evaluation|experiment|3\.?\s+', re.IGNORECASE),
-            'conclusion': re.compile(r'conclusion|discussion|4\.?\s+', re.IGNORECASE),
-            'references': re.compile(r'references|bibliography', re.IGNORECASE)
-        }
+        self.section_matcher = _SECTIONS
     
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """
@@ -46,23 +64,20 @@ class PDFExtractor:
         logger.info(f"Extrayendo texto de: {pdf_path}")
         
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                num_pages = len(pdf_reader.pages)
-                
-                logger.info(f"El PDF tiene {num_pages} páginas")
-                
-                # Extraer texto de todas las páginas
-                text = ""
-                for page_num in range(num_pages):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text() + "\n"
-                
-                # Limpiar el texto extraído
-                text = self._clean_text(text)
-                
-                logger.info(f"Extracción completada: {len(text)} caracteres")
-                return text
+            if pdfium is not None:
+                try:
+                    text = self._extract_with_pdfium(pdf_path)
+                except pdfium.PdfiumError as e:
+                    logger.warning(f"pypdfium2 no pudo leer {pdf_path} ({e}), usando PyPDF2")
+                    text = self._extract_with_pypdf2(pdf_path)
+            else:
+                text = self._extract_with_pypdf2(pdf_path)
+            
+            # Limpiar el texto extraído
+            text = self._clean_text(text)
+            
+            logger.info(f"Extracción completada: {len(text)} caracteres")
+            return text
                 
         except PyPDF2.errors.PdfReadError as e:
             logger.error(f"Error al leer el PDF {pdf_path}: {e}")
@@ -71,6 +86,80 @@ class PDFExtractor:
             logger.error(f"Error inesperado al procesar {pdf_path}: {e}")
             raise
     
+    def _extract_with_pdfium(self, pdf_path: str) -> str:
+        """
+        Extrae el texto sin limpiar de todas las páginas usando pypdfium2.
+        
+        Args:
+            pdf_path: Ruta al archivo PDF
+            
+        Returns:
+            Texto de todas las páginas
+        """
+        # Con una ruta PDFium lee el archivo desde C; con un buffer o un mmap lo
+        # leería mediante callbacks de Python
+        return "\n".join(self._iter_pdfium_pages(pdfium.PdfDocument(pdf_path)))
+    
+    def _iter_pdfium_pages(self, pdf) -> Iterator[str]:
+        """
+        Genera el texto sin limpiar de cada página de un documento de pypdfium2
+        y lo cierra al terminar.
+        
+        PDFium no es seguro entre hilos, así que las páginas se leen en secuencia;
+        el paralelismo se obtiene procesando varios PDFs a la vez.
+        
+        Args:
+            pdf: Documento abierto con pypdfium2
+            
+        Yields:
+            Texto de cada página
+        """
+        try:
+            logger.info(f"El PDF tiene {len(pdf)} páginas")
+            
+            for page in pdf:
+                textpage = page.get_textpage()
+                page_text = textpage.get_text_bounded()
+                textpage.close()
+                page.close()
+                yield page_text
+        finally:
+            pdf.close()
+    
+    def _extract_with_pypdf2(self, pdf_path: str) -> str:
+        """
+        Extrae el texto sin limpiar de todas las páginas usando PyPDF2.
+        
+        Args:
+            pdf_path: Ruta al archivo PDF
+            
+        Returns:
+            Texto de todas las páginas
+        """
+        # Extraer texto de todas las páginas y unirlo una sola vez al final
+        return "\n".join(self._iter_pypdf2_pages(pdf_path))
+    
+    def _iter_pypdf2_pages(self, pdf_path: str) -> Iterator[str]:
+        """
+        Genera el texto sin limpiar de cada página usando PyPDF2.
+        
+        Args:
+            pdf_path: Ruta al archivo PDF
+            
+        Yields:
+            Texto de cada página
+        """
+        # El archivo con buffer ya agrupa las lecturas pequeñas de PyPDF2; pasarle
+        # un mmap o un BytesIO no acelera la extracción, dominada por el parseo
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            num_pages = len(pdf_reader.pages)
+            
+            logger.info(f"El PDF tiene {num_pages} páginas")
+            
+            for page in pdf_reader.pages:
+                yield page.extract_text()
+    
     def _clean_text(self, text: str) -> str:
         """
         Limpia el texto extraído del PDF.
@@ -81,16 +170,8 @@ class PDFExtractor:
         Returns:
             Texto limpio
         """
-        # Eliminar múltiples espacios en blanco
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Eliminar caracteres no imprimibles
-        text = re.sub(r'[^\x20-\x7E\n]', '', text)
-        
-        # Normalizar saltos de línea
-        text = re.sub(r'[\r\n]+', '\n', text)
-        
-        return text.strip()
+        # Colapsar espacios en blanco y eliminar caracteres no imprimibles
+        return clean_text(text)
     
     def extract_paper_metadata(self, text: str) -> Dict[str, str]:
         """
@@ -108,17 +189,28 @@ class PDFExtractor:
             'arxiv_id': ''
         }
         
-        # Intentar extraer el título (primeras líneas, hasta el primer punto)
-        first_lines = text.split('\n')[0:3]
-        title_text = ' '.join(first_lines)
-        title_match = re.search(r'^(.*?)\s*(?:Abstract|\.)', title_text, re.DOTALL)
+        # Intentar extraer el título (primeras líneas, hasta el primer punto).
+        # Se localiza el final de la tercera línea con find en lugar de partir
+        # todo el documento en líneas.
+        end_pos = -1
+        for _ in range(3):
+            end_pos = text.find('\n', end_pos + 1)
+            if end_pos == -1:
+                break
+        title_text = (text if end_pos == -1 else text[:end_pos]).replace('\n', ' ')
+        title_match = _TITLE_RE.search(title_text)
         if title_match:
             metadata['title'] = title_match.group(1).strip()
         
-        # Intentar extraer ID de arXiv si está presente
-        arxiv_match = re.search(r'arXiv:(\d+\.\d+v\d+)', text)
-        if arxiv_match:
-            metadata['arxiv_id'] = arxiv_match.group(1)
+        # Intentar extraer ID de arXiv si está presente. El prefijo literal se
+        # busca con str.find y la expresión regular solo se aplica justo detrás
+        prefix_pos = text.find(_ARXIV_PREFIX)
+        while prefix_pos != -1:
+            arxiv_match = _ARXIV_ID_RE.match(text, prefix_pos + len(_ARXIV_PREFIX))
+            if arxiv_match:
+                metadata['arxiv_id'] = arxiv_match.group(0)
+                break
+            prefix_pos = text.find(_ARXIV_PREFIX, prefix_pos + 1)
         
         return metadata
     
@@ -134,26 +226,25 @@ class PDFExtractor:
         """
         sections = {}
         
-        # Encontrar posiciones de los encabezados de sección
-        section_positions = {}
-        for section_name, pattern in self.section_patterns.items():
-            matches = pattern.finditer(text)
-            for match in matches:
-                section_positions[match.start()] = section_name
-        
-        # Ordenar posiciones
-        positions = sorted(section_positions.keys())
+        # Posición de cada encabezado de sección (su primera aparición)
+        positions = [
+            (start_pos, section_name)
+            for section_name, start_pos in self.section_matcher.find_first(text).items()
+        ]
+        positions.sort()
         
         # Extraer cada sección
-        for i, start_pos in enumerate(positions):
-            section_name = section_positions[start_pos]
-            end_pos = positions[i+1] if i < len(positions)-1 else None
+        for i, (start_pos, section_name) in enumerate(positions):
+            end_pos = positions[i+1][0] if i < len(positions)-1 else None
             
             section_text = text[start_pos:end_pos].strip()
             sections[section_name] = section_text
         
         return sections
 
+# Instancia compartida por las funciones de conveniencia (no guarda estado)
+_DEFAULT = PDFExtractor()
+
 # Función de conveniencia para usar directamente
 def extract_text_from_pdf(pdf_path: str) -> Tuple[str, Dict[str, str]]:
     """
@@ -165,7 +256,6 @@ def extract_text_from_pdf(pdf_path: str) -> Tuple[str, Dict[str, str]]:
     Returns:
         Tupla con (texto_completo, metadatos)
     """
-    extractor = PDFExtractor()
-    text = extractor.extract_text_from_pdf(pdf_path)
-    metadata = extractor.extract_paper_metadata(text)
-    return text, metadata
\ No newline at end of file
+    text = _DEFAULT.extract_text_from_pdf(pdf_path)
+    metadata = _DEFAULT.extract_paper_metadata(text)
+    return text, metadata
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Detección de encabezados de sección compartida por el extractor de PDF y el
+preprocesador.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Motor RE2 opcional (google-re2): tiempo lineal garantizado, sin retroceso, y
+# con estos patrones unas tres veces más rápido que re; si no está instalado se
+# usa re.
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# Especificación de secciones: nombre -> (palabras clave, patrón de encabezado
+# numerado o None). El orden de las palabras clave es el de la alternancia de
+# la expresión regular equivalente.
+SectionSpec = Dict[str, Tuple[Tuple[str, ...], Optional[str]]]
+
+def _compile_ignorecase(pattern: str):
+    """
+    Compila un patrón que no distingue mayúsculas, con RE2 si está disponible.
+    
+    Args:
+        pattern: Expresión regular
+    
+    Returns:
+        Expresión compilada (RE2 o re, con la misma interfaz de búsqueda)
+    """
+    if re2 is not None:
+        return re2.compile(f'(?i){pattern}')
+    return re.compile(pattern, re.IGNORECASE)
+
+class SectionMatcher:
+    """
+    Localiza los encabezados de sección de un texto.
+    
+    Cada sección se busca con una expresión regular que une sus palabras clave
+    y su patrón numerado (p. ej. "2. "). Con RE2 los resultados son los mismos
+    que con re: RE2 solo se usa con texto ASCII (por ejemplo, en \\s solo admite
+    espacios ASCII) y el resto del texto se busca con re.
+    """
+    
+    def __init__(self, sections: SectionSpec):
+        """
+        Inicializa el detector.
+        
+        Args:
+            sections: Palabras clave y patrón numerado de cada sección, en el
+                orden en que se buscan
+        """
+        # Expresión regular equivalente de cada sección
+        alternations = {
+            name: '|'.join(keywords + ((numbered,) if numbered else ()))
+            for name, (keywords, numbered) in sections.items()
+        }
+        self.patterns = {name: _compile_ignorecase(pattern) for name, pattern in alternations.items()}
+        
+        # Las mismas expresiones con re, para el texto no ASCII
+        self._re_patterns = self.patterns if re2 is None else {
+            name: re.compile(pattern, re.IGNORECASE) for name, pattern in alternations.items()
+        }
+    
+    def find_first(self, text: str) -> Dict[str, int]:
+        """
+        Devuelve la posición de la primera aparición de cada sección.
+        
+        Se hace una búsqueda por sección en lugar de una única alternancia con
+        grupos nombrados: el motor de re no construye un autómata compartido
+        para la alternancia, la prueba alternativa por alternativa en cada
+        posición, y cada búsqueda por separado se detiene en su primera
+        coincidencia. Con el paper de ejemplo la alternancia tarda unos 16 ms
+        frente a 2 ms (0,5 ms con RE2).
+        
+        Args:
+            text: Texto en el que buscar
+        
+        Returns:
+            Diccionario sección -> posición de inicio de las secciones encontradas
+        """
+        patterns = self.patterns if text.isascii() else self._re_patterns
+        first = {}
+        for name, pattern in patterns.items():
+            match = pattern.search(text)
+            if match:
+                first[name] = match.start()
+        return first
+    
+    def find_nested(self, text: str) -> List[Tuple[str, int]]:
+        """
+        Busca cada sección, en orden, en el texto anterior a la sección encontrada
+        previamente.
+        
+        Cada búsqueda se detiene en la primera coincidencia, que suele estar al
+        principio del texto. En lugar de recortar el texto en cada paso se limita
+        la búsqueda con endpos, que equivale a buscar en el texto recortado.
+        
+        Args:
+            text: Texto en el que buscar
+        
+        Returns:
+            Lista de (sección, posición de inicio) de las secciones encontradas
+        """
+        found = []
+        end_pos = len(text)
+        
+        patterns = self.patterns if text.isascii() else self._re_patterns
+        for name, pattern in patterns.items():
+            match = pattern.search(text, 0, end_pos)
+            if match:
+                found.append((name, match.start()))
+                end_pos = match.start()
+        
+        return found
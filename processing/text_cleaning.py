@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Limpieza de texto compartida por el extractor de PDF y el preprocesador.
+"""
+
+# Caracteres de control ASCII a eliminar (se conserva el salto de línea)
+_CONTROL_BYTES = bytes(code for code in range(0x20) if code != 0x0A) + b"\x7f"
+
+def clean_text(text: str) -> str:
+    """
+    Colapsa los espacios en blanco y elimina los caracteres no imprimibles.
+    
+    Equivale a aplicar re.sub(r'\\s+', ' ', ...), después re.sub(r'[^\\x20-\\x7E\\n]', '', ...)
+    y finalmente strip(), pero con operaciones de cadena implementadas en C en
+    lugar de varias pasadas del motor de expresiones regulares. Como el colapso
+    elimina todos los saltos de línea, el resultado queda en una sola línea.
+    
+    Args:
+        text: Texto a limpiar
+    
+    Returns:
+        Texto limpio
+    """
+    # str.split() separa por los mismos caracteres que \s en expresiones regulares
+    text = " ".join(text.split())
+    
+    # Eliminar los caracteres no ASCII al codificar y después los de control con
+    # bytes.translate, que trabaja byte a byte sin tabla de traducción; solo se
+    # decodifica al final (puede quedar espacio en los extremos)
+    data = text.encode("ascii", "ignore").translate(None, _CONTROL_BYTES)
+    return data.decode("ascii").strip()
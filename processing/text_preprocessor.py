@@ -3,12 +3,67 @@
 Módulo para preprocesamiento de texto extraído de papers.
 """
 
-import re
 import logging
-from typing import Dict, List, Any, Optional
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Any, Optional, Tuple, Union
+
+from processing.section_detection import SectionMatcher
+from processing.text_cleaning import clean_text
 
 logger = logging.getLogger(__name__)
 
+# Encabezados de las secciones principales, en el orden en que se buscan
+_SECTIONS = SectionMatcher({
+    'abstract': (('abstract',), None),
+    'introduction': (('introduction',), r'1\.?\s+introduction'),
+    'methodology': (('methodology', 'method'), r'2\.?\s+'),
+    'results': (('results', 'evaluation'), r'3\.?\s+'),
+    'conclusion': (('conclusion', 'discussion'), r'4\.?\s+')
+})
+
+# Metadatos vacíos de solo lectura, compartidos como base de los Chunks de los
+# textos sin metadatos que caben en un solo chunk (el caso habitual) en lugar de
+# crear un dict por llamada; al acceder a un chunk se devuelve un dict normal
+_EMPTY_METADATA = MappingProxyType({})
+
+@dataclass
+class Chunks:
+    """
+    Chunks de un paper almacenados como listas paralelas.
+    
+    Todos los chunks comparten los metadatos de base y solo difieren en la
+    sección y la parte, así que en lugar de un diccionario de metadatos por
+    chunk se guarda una lista por campo. Para los consumidores que esperan una
+    lista de diccionarios {'text', 'metadata'} se comporta como tal: el
+    diccionario de cada chunk, con sus metadatos como dict, se construye al
+    acceder a él.
+    """
+    texts: List[str] = field(default_factory=list)
+    sections: List[Optional[str]] = field(default_factory=list)
+    parts: List[Optional[int]] = field(default_factory=list)
+    base: Dict[str, Any] = field(default_factory=dict)
+    
+    def __len__(self) -> int:
+        return len(self.texts)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        # Como una lista: un slice devuelve una lista de chunks
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.texts)))]
+        
+        overrides = {}
+        section = self.sections[index]
+        if section is not None:
+            overrides['section'] = section
+        part = self.parts[index]
+        if part is not None:
+            overrides['chunk_part'] = f"{part}"
+        return {'text': self.texts[index], 'metadata': {**self.base, **overrides}}
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self[i] for i in range(len(self.texts)))
+
 class TextPreprocessor:
     """Clase para preprocesar texto de papers académicos."""
     
@@ -41,16 +96,17 @@ class TextPreprocessor:
         
         # Dividir en chunks si es necesario (en lugar de truncar)
         chunks = self.split_into_chunks(text, metadata)
+        first_chunk = next(chunks)
         
         # Si solo hay un chunk, devolver el texto procesado
-        if len(chunks) == 1:
-            return self._structure_text(chunks[0]['text'], metadata)
+        if next(chunks, None) is None:
+            return self._structure_text(first_chunk['text'], metadata)
         
         # Si hay múltiples chunks, usamos el primero para análisis inicial
         # (Esta función ahora devuelve solo el primer chunk,
         # pero process_paper() se encargará de procesar todos)
-        logger.info(f"Texto dividido en {len(chunks)} chunks")
-        return self._structure_text(chunks[0]['text'], chunks[0]['metadata'])
+        logger.info(f"Texto dividido en {first_chunk['metadata']['total_chunks']} chunks")
+        return self._structure_text(first_chunk['text'], first_chunk['metadata'])
     
     def _clean_text(self, text: str) -> str:
         """
@@ -62,27 +118,59 @@ class TextPreprocessor:
         Returns:
             Texto limpio
         """
-        # Reemplazar múltiples espacios en blanco
-        text = re.sub(r'\s+', ' ', text)
+        # Colapsar espacios en blanco y eliminar caracteres no imprimibles en una
+        # sola pasada. El colapso también elimina los saltos de línea, así que los
+        # filtros de números de página y encabezados por línea no tenían efecto.
+        return clean_text(text)
+    
+    def split_into_chunks(self, text: str, metadata: Optional[Dict[str, Any]] = None, 
+                       chunk_size: int = 6000) -> Iterator[Dict[str, Any]]:
+        """
+        Divide el texto en chunks procesables con superposición para mantener contexto.
         
-        # Normalizar saltos de línea
-        text = re.sub(r'[\r\n]+', '\n', text)
+        Los chunks se generan a medida que se consumen. El número total de chunks
+        se calcula antes en una pasada que solo cuenta, de modo que cada chunk se
+        genera ya con sus metadatos definitivos. Quien necesite una lista debe
+        envolver el resultado en list() o usar collect_chunks().
         
-        # Eliminar caracteres no imprimibles
-        text = re.sub(r'[^\x20-\x7E\n]', '', text)
+        Args:
+            text: Texto completo del paper
+            metadata: Metadatos opcionales del paper
+            chunk_size: Tamaño objetivo de cada chunk en tokens
+            
+        Yields:
+            Diccionarios con texto y metadatos para cada chunk
+        """
+        plan = self._plan_chunks(text, chunk_size)
+        
+        # Si el texto cabe en un solo chunk, devolverlo
+        if plan is None:
+            yield {
+                'text': text,
+                'metadata': metadata or {}
+            }
+            return
         
-        # Eliminar números de página
-        text = re.sub(r'\n\s*\d+\s*\n', '\n', text)
+        total_chunks, parts = plan
         
-        # Eliminar encabezados y pies de página repetitivos
-        text = re.sub(r'\n.{1,50}arXiv.{1,50}\n', '\n', text)
+        # Añadir metadatos básicos a todos los chunks
+        chunk_metadata = metadata.copy() if metadata else {}
+        chunk_metadata['total_chunks'] = total_chunks
         
-        return text.strip()
+        for chunk_text, section_name, part in parts:
+            overrides = {'section': section_name}
+            if part is not None:
+                overrides['chunk_part'] = f"{part}"
+            yield {
+                'text': chunk_text,
+                'metadata': {**chunk_metadata, **overrides}
+            }
     
-    def split_into_chunks(self, text: str, metadata: Optional[Dict[str, Any]] = None, 
-                       chunk_size: int = 6000) -> List[Dict[str, Any]]:
+    def collect_chunks(self, text: str, metadata: Optional[Dict[str, Any]] = None,
+                       chunk_size: int = 6000) -> Chunks:
         """
-        Divide el texto en chunks procesables con superposición para mantener contexto.
+        Divide el texto en chunks como split_into_chunks, pero los devuelve como
+        listas paralelas en lugar de un diccionario por chunk.
         
         Args:
             text: Texto completo del paper
@@ -90,93 +178,107 @@ class TextPreprocessor:
             chunk_size: Tamaño objetivo de cada chunk en tokens
             
         Returns:
-            Lista de diccionarios con texto y metadatos para cada chunk
+            Chunks del texto
+        """
+        plan = self._plan_chunks(text, chunk_size)
+        
+        # Si el texto cabe en un solo chunk, devolverlo
+        if plan is None:
+            return Chunks(texts=[text], sections=[None], parts=[None], base=metadata or _EMPTY_METADATA)
+        
+        total_chunks, parts = plan
+        
+        chunks = Chunks(base=metadata.copy() if metadata else {})
+        chunks.base['total_chunks'] = total_chunks
+        
+        texts, sections, part_numbers = chunks.texts, chunks.sections, chunks.parts
+        for chunk_text, section_name, part in parts:
+            texts.append(chunk_text)
+            sections.append(section_name)
+            part_numbers.append(part)
+        
+        return chunks
+    
+    def _plan_chunks(self, text: str,
+                     chunk_size: int) -> Optional[Tuple[int, Iterator[Tuple[str, str, Optional[int]]]]]:
+        """
+        Calcula la división en chunks de un texto.
+        
+        Args:
+            text: Texto completo del paper
+            chunk_size: Tamaño objetivo de cada chunk en tokens
+            
+        Returns:
+            None si el texto cabe en un solo chunk; si no, tupla con el número
+            total de chunks y un iterador de (texto, sección, parte), donde la
+            parte es None para las secciones que caben completas
         """
         # Estimar número de tokens
         estimated_tokens = len(text) // self.char_to_token_ratio
         
-        # Si el texto cabe en un solo chunk, devolverlo
+        # Si el texto cabe en un solo chunk, no hay que dividirlo
         if estimated_tokens <= chunk_size:
-            return [{
-                'text': text,
-                'metadata': metadata or {}
-            }]
+            return None
         
         # Estimar número de caracteres por chunk
         chars_per_chunk = chunk_size * self.char_to_token_ratio
         
         # Dividir primero por secciones principales
         sections = {}
-        section_patterns = {
-            'abstract': r'abstract',
-            'introduction': r'introduction|1\.?\s+introduction',
-            'methodology': r'methodology|method|2\.?\s+',
-            'results': r'results|evaluation|3\.?\s+',
-            'conclusion': r'conclusion|discussion|4\.?\s+'
-        }
         
         # Identificar secciones
-        current_text = text
-        for section_name, pattern in section_patterns.items():
-            match = re.search(pattern, current_text, re.IGNORECASE)
-            if match:
-                start_idx = match.start()
-                sections[section_name] = current_text[start_idx:]
-                current_text = current_text[:start_idx]
+        # (cada una se busca en el texto anterior a la encontrada previamente)
+        end_idx = len(text)
+        for section_name, start_idx in _SECTIONS.find_nested(text):
+            sections[section_name] = text[start_idx:end_idx]
+            end_idx = start_idx
         
         # Si hay texto restante, considerar como "preámbulo"
+        current_text = text[:end_idx]
         if current_text.strip():
             sections['preambulo'] = current_text
         
-        # Crear chunks con secciones completas si son pequeñas, o dividiendo si son grandes
-        chunks = []
+        # Primero van las secciones importantes que caben completas y después el
+        # resto de secciones, que se dividen si son grandes
+        priority_sections = ['abstract', 'conclusion']
+        section_order = [
+            section_name for section_name in priority_sections
+            if section_name in sections and len(sections[section_name]) <= chars_per_chunk
+        ]
+        section_order.extend(
+            section_name for section_name in sections if section_name not in section_order
+        )
         
-        # Añadir metadatos básicos a todos los chunks
-        chunk_metadata = metadata.copy() if metadata else {}
-        chunk_metadata['total_chunks'] = 0  # Lo actualizaremos después
+        # Superposición entre chunks de una misma sección (10%)
+        overlap = min(500, chars_per_chunk // 10)
+        step = chars_per_chunk - overlap
         
-        # Primero tratamos de preservar secciones importantes completas
-        priority_sections = ['abstract', 'conclusion']
-        for section_name in priority_sections:
-            if section_name in sections:
+        # Primera pasada: contar los chunks sin construirlos
+        total_chunks = 0
+        for section_name in section_order:
+            section_length = len(sections[section_name])
+            if section_length <= chars_per_chunk:
+                total_chunks += 1
+            else:
+                total_chunks += -(-section_length // step)
+        
+        logger.info(f"Texto dividido en {total_chunks} chunks")
+        
+        # Segunda pasada (perezosa): generar el texto de cada chunk
+        def iter_parts() -> Iterator[Tuple[str, str, Optional[int]]]:
+            for section_name in section_order:
                 section_text = sections[section_name]
                 if len(section_text) <= chars_per_chunk:
                     # La sección cabe completa
-                    chunks.append({
-                        'text': section_text,
-                        'metadata': {**chunk_metadata, 'section': section_name}
-                    })
-                    # Eliminar esta sección de la lista pendiente
-                    del sections[section_name]
-        
-        # Ahora dividimos el resto de secciones
-        for section_name, section_text in sections.items():
-            if len(section_text) <= chars_per_chunk:
-                # La sección cabe completa
-                chunks.append({
-                    'text': section_text,
-                    'metadata': {**chunk_metadata, 'section': section_name}
-                })
-            else:
-                # Dividir sección en múltiples chunks con superposición
-                overlap = min(500, chars_per_chunk // 10)  # 10% de superposición
-                for i in range(0, len(section_text), chars_per_chunk - overlap):
-                    chunk_text = section_text[i:i + chars_per_chunk]
-                    chunks.append({
-                        'text': chunk_text,
-                        'metadata': {
-                            **chunk_metadata, 
-                            'section': section_name,
-                            'chunk_part': f"{i // (chars_per_chunk - overlap) + 1}"
-                        }
-                    })
-        
-        # Actualizar el número total de chunks en los metadatos
-        for chunk in chunks:
-            chunk['metadata']['total_chunks'] = len(chunks)
-        
-        logger.info(f"Texto dividido en {len(chunks)} chunks")
-        return chunks
+                    yield section_text, section_name, None
+                else:
+                    # Dividir sección en múltiples chunks con superposición
+                    # (el número de parte sale de enumerate en lugar de dividir
+                    # cada desplazamiento entre el paso)
+                    for part, i in enumerate(range(0, len(section_text), step), 1):
+                        yield section_text[i:i + chars_per_chunk], section_name, part
+        
+        return total_chunks, iter_parts()
     
     def _structure_text(self, text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
         """
@@ -189,24 +291,24 @@ class TextPreprocessor:
         Returns:
             Texto estructurado
         """
-        # Añadir metadatos si están disponibles
+        # Añadir metadatos si están disponibles (las líneas se unen una sola vez)
         if metadata:
-            header = ""
+            header_lines = []
             if 'title' in metadata and metadata['title']:
-                header += f"Título: {metadata['title']}\n"
+                header_lines.append(f"Título: {metadata['title']}\n")
             if 'authors' in metadata and metadata['authors']:
-                header += f"Autores: {metadata['authors']}\n"
+                header_lines.append(f"Autores: {metadata['authors']}\n")
             if 'arxiv_id' in metadata and metadata['arxiv_id']:
-                header += f"ArXiv ID: {metadata['arxiv_id']}\n"
+                header_lines.append(f"ArXiv ID: {metadata['arxiv_id']}\n")
             if 'section' in metadata:
-                header += f"Sección: {metadata['section']}\n"
+                header_lines.append(f"Sección: {metadata['section']}\n")
             if 'chunk_part' in metadata:
-                header += f"Parte: {metadata['chunk_part']}\n"
+                header_lines.append(f"Parte: {metadata['chunk_part']}\n")
             if 'total_chunks' in metadata:
-                header += f"Total de partes: {metadata['total_chunks']}\n"
+                header_lines.append(f"Total de partes: {metadata['total_chunks']}\n")
             
-            if header:
-                text = f"{header}\n\n{text}"
+            if header_lines:
+                text = "".join((*header_lines, "\n\n", text))
         
         return text
 
@@ -227,7 +329,7 @@ def preprocess_text(text: str, metadata: Optional[Dict[str, Any]] = None, max_to
     return preprocessor.preprocess(text, metadata)
 
 # Función de conveniencia para dividir en chunks
-def split_text_into_chunks(text: str, metadata: Optional[Dict[str, Any]] = None, chunk_size: int = 6000) -> List[Dict[str, Any]]:
+def split_text_into_chunks(text: str, metadata: Optional[Dict[str, Any]] = None, chunk_size: int = 6000) -> Chunks:
     """
     Función auxiliar para dividir texto en chunks.
     
@@ -237,8 +339,8 @@ def split_text_into_chunks(text: str, metadata: Optional[Dict[str, Any]] = None,
         chunk_size: Tamaño objetivo de cada chunk en tokens
         
     Returns:
-        Lista de chunks con texto y metadatos
+        Chunks con texto y metadatos
     """
     preprocessor = TextPreprocessor()
     cleaned_text = preprocessor._clean_text(text)
-    return preprocessor.split_into_chunks(cleaned_text, metadata, chunk_size)
\ No newline at end of file
+    return preprocessor.collect_chunks(cleaned_text, metadata, chunk_size)
\ No newline at end of file
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del registro de papers procesados y su diario.
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from input.file_manager import (
+    MANIFEST_FILENAME, MANIFEST_JOURNAL_FILENAME, append_to_manifest, load_manifest, save_manifest
+)
+
+class ManifestJournalTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output_dir = self.tmp.name
+        self.journal_path = os.path.join(self.output_dir, MANIFEST_JOURNAL_FILENAME)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_append_writes_one_line_per_paper(self):
+        append_to_manifest("a.pdf", "h1", self.output_dir)
+        append_to_manifest("b.pdf", "h2", self.output_dir)
+        
+        with open(self.journal_path, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines, [{'name': 'a.pdf', 'hash': 'h1'}, {'name': 'b.pdf', 'hash': 'h2'}])
+    
+    def test_load_compacts_journal_into_manifest(self):
+        save_manifest({"a.pdf": "viejo", "c.pdf": "h3"}, self.output_dir)
+        append_to_manifest("a.pdf", "h1", self.output_dir)
+        append_to_manifest("b.pdf", "h2", self.output_dir)
+        
+        expected = {"a.pdf": "h1", "b.pdf": "h2", "c.pdf": "h3"}
+        self.assertEqual(load_manifest(self.output_dir), expected)
+        self.assertFalse(os.path.exists(self.journal_path))
+        
+        with open(os.path.join(self.output_dir, MANIFEST_FILENAME), encoding='utf-8') as f:
+            self.assertEqual(json.load(f), expected)
+        self.assertEqual(load_manifest(self.output_dir), expected)
+    
+    def test_torn_last_line_is_ignored(self):
+        append_to_manifest("a.pdf", "h1", self.output_dir)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"name": "b.pdf", "ha')
+        
+        with self.assertLogs("input.file_manager", level="WARNING"):
+            manifest = load_manifest(self.output_dir)
+        self.assertEqual(manifest, {"a.pdf": "h1"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del cliente de OpenAI (sin llamadas a la API).
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm.openai_client as openai_client
+from llm.openai_client import BatchPlanner, OpenAIClient, _completion_from_content, _is_complete_analysis
+from llm.response_cache import SemanticCache
+
+def make_client(**kwargs):
+    """Crea un cliente sin cachés persistentes."""
+    with mock.patch("llm.openai_client.get_response_cache", return_value=None), \
+         mock.patch("llm.openai_client.get_semantic_cache", return_value=None):
+        return OpenAIClient(api_key="sk-test", retry_delay=0, **kwargs)
+
+def raw_response(parsed):
+    """Respuesta cruda de la API con cabeceras vacías."""
+    return SimpleNamespace(headers={}, parse=lambda: parsed)
+
+def analysis_json(name):
+    """Contenido JSON de un análisis completo."""
+    return f'{{"nombre": "{name}", "resumen": "r", "resultados": "x", "exito": true, "performance": "p"}}'
+
+def rate_limit_error():
+    """Error 429 de la API que pide reintentar de inmediato."""
+    import httpx
+    from openai import RateLimitError
+    
+    response = httpx.Response(429, headers={"retry-after": "0"},
+                              request=httpx.Request("POST", "https://api.openai.com/v1/embeddings"))
+    return RateLimitError("rate limit", response=response, body=None)
+
+class CompleteAnalysisTest(unittest.TestCase):
+    
+    def test_complete_analysis(self):
+        analysis = {"nombre": "T", "resumen": "r", "resultados": "x", "exito": False, "performance": "p"}
+        self.assertTrue(_is_complete_analysis(analysis))
+    
+    def test_format_error_fallback_is_not_complete(self):
+        analysis = {"nombre": "T", "resumen": "texto", "resultados": "No disponible (error de formato)",
+                    "exito": None, "performance": "No disponible (error de formato)"}
+        self.assertFalse(_is_complete_analysis(analysis))
+    
+    def test_error_or_missing_fields_are_not_complete(self):
+        self.assertFalse(_is_complete_analysis(
+            {"resumen": "r", "resultados": "x", "exito": True, "performance": "p", "error": "fallo"}
+        ))
+        self.assertFalse(_is_complete_analysis({"resumen": "r", "exito": True}))
+
+class EmbeddingRetryTest(unittest.TestCase):
+    
+    def test_embedding_retries_rate_limit_errors(self):
+        client = make_client()
+        embedding = SimpleNamespace(data=[SimpleNamespace(embedding=[0.1, 0.2])])
+        create = mock.Mock(side_effect=[rate_limit_error(), raw_response(embedding)])
+        client.client = SimpleNamespace(embeddings=SimpleNamespace(with_raw_response=SimpleNamespace(create=create)))
+        
+        self.assertEqual(client._embed("texto del paper"), [0.1, 0.2])
+        self.assertEqual(create.call_count, 2)
+    
+    def test_embedding_failure_is_a_cache_miss(self):
+        client = make_client(max_retries=2)
+        create = mock.Mock(side_effect=[rate_limit_error(), rate_limit_error()])
+        client.client = SimpleNamespace(embeddings=SimpleNamespace(with_raw_response=SimpleNamespace(create=create)))
+        
+        self.assertIsNone(client._embed("texto del paper"))
+        self.assertEqual(create.call_count, 2)
+
+class BatchPlannerTest(unittest.TestCase):
+    
+    def setUp(self):
+        # 4 caracteres por token, sin depender de tiktoken
+        patcher = mock.patch.object(openai_client, "_get_encoding", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_add_returns_full_batch_on_overflow(self):
+        # Cada paper ocupa 1000 tokens de texto más 1000 de respuesta
+        planner = BatchPlanner("gpt-4", 5000)
+        papers = [(f"p{i}.pdf", "x" * 4000) for i in range(5)]
+        
+        self.assertIsNone(planner.add(papers[0]))
+        self.assertIsNone(planner.add(papers[1]))
+        self.assertEqual(planner.add(papers[2]), papers[:2])
+        self.assertIsNone(planner.add(papers[3]))
+        self.assertEqual(planner.add(papers[4]), papers[2:4])
+        self.assertEqual(planner.flush(), papers[4:])
+        self.assertEqual(planner.flush(), [])
+    
+    def test_plan_batches_tokenizes_each_paper_once(self):
+        client = make_client()
+        papers = [(f"p{i}.pdf", "x" * 4000) for i in range(7)]
+        
+        with mock.patch.object(openai_client, "count_tokens", wraps=openai_client.count_tokens) as counter:
+            batches = client.plan_batches(papers)
+        
+        self.assertEqual(counter.call_count, len(papers))
+        self.assertEqual([paper for batch in batches for paper in batch], papers)
+        self.assertGreater(len(batches), 1)
+
+class BatchAnalysisTest(unittest.TestCase):
+    
+    def setUp(self):
+        patcher = mock.patch.object(openai_client, "_get_encoding", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = make_client()
+    
+    def test_batch_too_large_for_context_falls_back_to_single_papers(self):
+        papers = [("a.pdf", "a" * 8000), ("b.pdf", "b" * 8000)]
+        self.client.context_window = 4000
+        call_api = mock.Mock(side_effect=lambda prompt, max_tokens=None: _completion_from_content(analysis_json("T")))
+        
+        with mock.patch.object(self.client, "_call_api", call_api):
+            analyses = self.client.analyze_papers_batch(papers)
+        
+        self.assertEqual(set(analyses), {"a.pdf", "b.pdf"})
+        self.assertEqual(call_api.call_count, 2)
+        self.assertTrue(all("===PAPER" not in call.args[0] for call in call_api.call_args_list))
+    
+    def test_cached_papers_are_not_sent_and_batch_results_are_cached(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.client.semantic_cache = SemanticCache(os.path.join(tmp.name, "semantic.sqlite3"))
+        papers = [("a.pdf", "texto a"), ("b.pdf", "texto b"), ("c.pdf", "texto c")]
+        
+        namespace = self.client.cache_namespace
+        cached = {"nombre": "A", "resumen": "r", "resultados": "x", "exito": True, "performance": "p"}
+        self.client.semantic_cache.add(SemanticCache.hash_text("texto a", namespace), None, cached, 7, namespace)
+        
+        content = f'{{"1": {analysis_json("B")}, "2": {analysis_json("C")}}}'
+        call_api = mock.Mock(return_value=_completion_from_content(content))
+        with mock.patch.object(self.client, "_embed", return_value=None), \
+             mock.patch.object(self.client, "_call_api", call_api):
+            analyses = self.client.analyze_papers_batch(papers)
+        
+        self.assertEqual({name: analysis["nombre"] for name, analysis in analyses.items()},
+                         {"a.pdf": "A", "b.pdf": "B", "c.pdf": "C"})
+        call_api.assert_called_once()
+        self.assertNotIn("texto a", call_api.call_args.args[0])
+        self.assertEqual(
+            self.client.semantic_cache.get_exact(SemanticCache.hash_text("texto c", namespace))["nombre"], "C"
+        )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas del limitador de peticiones.
+"""
+
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.rate_limiter import RateLimiter, parse_reset_duration
+
+class RateLimiterTest(unittest.TestCase):
+    
+    def test_parse_reset_duration(self):
+        self.assertEqual(parse_reset_duration("6m0s"), 360)
+        self.assertAlmostEqual(parse_reset_duration("20ms"), 0.02)
+        self.assertIsNone(parse_reset_duration("nada"))
+    
+    def test_all_concurrent_callers_wait_for_exhausted_budget(self):
+        limiter = RateLimiter()
+        limiter.update({
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "300ms",
+        })
+        
+        start = time.monotonic()
+        waits = []
+        waits_lock = threading.Lock()
+        
+        def call():
+            limiter.acquire(10)
+            with waits_lock:
+                waits.append(time.monotonic() - start)
+        
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(waits), 5)
+        for waited in waits:
+            self.assertGreaterEqual(waited, 0.25)
+    
+    def test_available_budget_does_not_wait(self):
+        limiter = RateLimiter()
+        limiter.update({
+            "x-ratelimit-remaining-requests": "5",
+            "x-ratelimit-reset-requests": "10s",
+            "x-ratelimit-remaining-tokens": "1000",
+            "x-ratelimit-reset-tokens": "10s",
+        })
+        
+        start = time.monotonic()
+        limiter.acquire(100)
+        self.assertLess(time.monotonic() - start, 0.1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de las cachés de respuestas y de análisis del LLM.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.response_cache import ResponseCache, SemanticCache, MIN_SEMANTIC_CAPACITY
+
+class ResponseCacheTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "responses.sqlite3")
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_set_and_get(self):
+        cache = ResponseCache(self.path)
+        key = ResponseCache.make_key("gpt-4", 0.2, "prompt")
+        self.assertIsNone(cache.get(key))
+        
+        cache.set(key, '{"resumen": "x"}')
+        self.assertEqual(cache.get(key), '{"resumen": "x"}')
+        self.assertNotEqual(key, ResponseCache.make_key("gpt-4", 0.3, "prompt"))
+    
+    def test_expired_response_is_not_returned(self):
+        cache = ResponseCache(self.path, ttl=-1)
+        cache.set("clave", "contenido")
+        self.assertIsNone(cache.get("clave"))
+
+class SemanticCacheTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "semantic.sqlite3")
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_exact_hash_includes_namespace(self):
+        cache = SemanticCache(self.path)
+        text_hash = SemanticCache.hash_text("texto", "gpt-4|0.2|1")
+        cache.add(text_hash, None, {"nombre": "A"}, 5, "gpt-4|0.2|1")
+        
+        self.assertEqual(cache.get_exact(text_hash), {"nombre": "A"})
+        self.assertNotEqual(text_hash, SemanticCache.hash_text("texto", "gpt-4o|0.2|1"))
+        self.assertIsNone(cache.get_exact(SemanticCache.hash_text("texto", "gpt-4o|0.2|1")))
+    
+    def test_similar_requires_same_namespace_and_length(self):
+        cache = SemanticCache(self.path, threshold=0.9)
+        cache.add("a", [1.0, 0.0, 0.0], {"nombre": "A"}, 1000, "ns")
+        
+        self.assertEqual(cache.get_similar([1.0, 0.01, 0.0], 1020, "ns"), {"nombre": "A"})
+        self.assertIsNone(cache.get_similar([1.0, 0.0, 0.0], 1000, "otro"))
+        self.assertIsNone(cache.get_similar([1.0, 0.0, 0.0], 1200, "ns"))
+        self.assertIsNone(cache.get_similar([0.0, 1.0, 0.0], 1000, "ns"))
+    
+    def test_expired_entry_does_not_hide_next_best_match(self):
+        cache = SemanticCache(self.path, threshold=0.9)
+        cache.add("a", [1.0, 0.0, 0.0], {"nombre": "A"}, 1000, "ns")
+        cache.add("b", [0.98, 0.05, 0.0], {"nombre": "B"}, 1000, "ns")
+        
+        # Simula que la mejor coincidencia expira durante la ejecución
+        cache._expires[cache._rows["a"]] = 0
+        self.assertEqual(cache.get_similar([1.0, 0.0, 0.0], 1000, "ns"), {"nombre": "B"})
+    
+    def test_entries_survive_reload_and_growth(self):
+        cache = SemanticCache(self.path, threshold=0.99)
+        for i in range(MIN_SEMANTIC_CAPACITY + 10):
+            cache.add(f"h{i}", [float(i), 1.0], {"nombre": str(i)}, 100, "ns")
+        self.assertGreater(cache._capacity, MIN_SEMANTIC_CAPACITY)
+        
+        reloaded = SemanticCache(self.path, threshold=0.99)
+        self.assertEqual(len(reloaded._hashes), MIN_SEMANTIC_CAPACITY + 10)
+        self.assertEqual(reloaded.get_similar([0.0, 1.0], 100, "ns"), {"nombre": "0"})
+        self.assertIsNone(reloaded.get_similar([0.0, 1.0], 100, "otro"))
+
+if __name__ == "__main__":
+    unittest.main()
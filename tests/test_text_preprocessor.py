@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de la división del texto de los papers en chunks.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from processing.text_preprocessor import Chunks, TextPreprocessor, split_text_into_chunks
+
+class ChunksTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.chunks = Chunks(
+            texts=["a", "b", "c"],
+            sections=["Introduction", None, "Results"],
+            parts=[1, 2, None],
+            base={"title": "T", "total_chunks": 3},
+        )
+    
+    def test_index_builds_chunk_dict(self):
+        self.assertEqual(self.chunks[0], {
+            "text": "a",
+            "metadata": {"title": "T", "total_chunks": 3, "section": "Introduction", "chunk_part": "1"},
+        })
+        self.assertEqual(self.chunks[-1]["metadata"], {"title": "T", "total_chunks": 3, "section": "Results"})
+    
+    def test_slice_returns_list_like_a_list(self):
+        as_list = list(self.chunks)
+        for index in (slice(None), slice(1, None), slice(None, -1), slice(None, None, -1), slice(5, 10)):
+            self.assertEqual(self.chunks[index], as_list[index])
+    
+    def test_metadata_is_not_shared_between_chunks(self):
+        self.chunks[0]["metadata"]["title"] = "otro"
+        self.assertEqual(self.chunks[0]["metadata"]["title"], "T")
+        self.assertEqual(self.chunks.base["title"], "T")
+
+class SplitIntoChunksTest(unittest.TestCase):
+    
+    def test_collect_chunks_matches_split_into_chunks(self):
+        text = "\n\n".join(f"Párrafo {i}. " + "palabra " * 200 for i in range(40))
+        metadata = {"title": "T"}
+        preprocessor = TextPreprocessor()
+        
+        expected = list(preprocessor.split_into_chunks(text, metadata, chunk_size=500))
+        chunks = preprocessor.collect_chunks(text, metadata, chunk_size=500)
+        
+        self.assertGreater(len(expected), 1)
+        self.assertEqual(list(chunks), expected)
+        self.assertEqual(chunks[1:3], expected[1:3])
+        self.assertEqual(metadata, {"title": "T"})
+    
+    def test_short_text_is_a_single_chunk(self):
+        chunks = split_text_into_chunks("texto corto", {"title": "T"})
+        self.assertEqual(list(chunks), [{"text": "texto corto", "metadata": {"title": "T"}}])
+
+if __name__ == "__main__":
+    unittest.main()
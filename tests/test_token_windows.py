@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pruebas de la división de papers en ventanas de tokens y del recorte de prompts.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm.openai_client as openai_client
+from llm.openai_client import CHUNK_OVERLAP_TOKENS, MAX_PROMPT_CHARS, count_tokens, split_token_windows
+from llm.prompt_templates import get_chunk_middle_prompt, get_paper_analysis_prompt
+
+class FakeEncoding:
+    """Tokenizador de prueba con un número fijo de caracteres por token."""
+    
+    def __init__(self, chars_per_token):
+        self.chars_per_token = chars_per_token
+    
+    def encode(self, text, disallowed_special=()):
+        step = self.chars_per_token
+        return [text[i:i + step] for i in range(0, len(text), step)]
+    
+    def decode(self, tokens):
+        return "".join(tokens)
+
+class TokenWindowsTest(unittest.TestCase):
+    
+    def setUp(self):
+        # Texto con más caracteres por token que la estimación de CHARS_PER_TOKEN
+        patcher = mock.patch.object(openai_client, "_get_encoding", return_value=FakeEncoding(6))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        openai_client.prompt_overhead_tokens.cache_clear()
+        self.addCleanup(openai_client.prompt_overhead_tokens.cache_clear)
+        
+        with mock.patch.object(openai_client, "get_response_cache", return_value=None), \
+             mock.patch.object(openai_client, "get_semantic_cache", return_value=None):
+            self.client = openai_client.OpenAIClient(api_key="sk-test")
+    
+    def test_windows_overlap_and_cover_the_text(self):
+        text = "".join(f"{i:06d}" for i in range(1000))
+        windows = split_token_windows(text, "gpt-4", 100, 10)
+        
+        self.assertTrue(all(count_tokens(window, "gpt-4") <= 100 for window in windows))
+        self.assertEqual(windows[0][-60:], windows[1][:60])
+        self.assertTrue(text.endswith(windows[-1]))
+    
+    def test_full_windows_are_not_truncated(self):
+        text = "x" * (self.client.paper_token_budget * 6 * 3)
+        windows = split_token_windows(text, "gpt-4", self.client.paper_token_budget, CHUNK_OVERLAP_TOKENS)
+        full_windows = [
+            window for window in windows
+            if count_tokens(window, "gpt-4") == self.client.paper_token_budget
+        ]
+        self.assertGreater(len(full_windows), 1)
+        
+        for window in full_windows:
+            for prompt in (get_paper_analysis_prompt(window),
+                           get_chunk_middle_prompt(window, "Parte 2/3 - Sección: texto")):
+                # Más largo que el antiguo límite en caracteres, pero dentro del de tokens
+                self.assertGreater(len(prompt), MAX_PROMPT_CHARS)
+                self.assertEqual(self.client._truncate_prompt(prompt), prompt)
+    
+    def test_long_prompt_is_truncated_to_the_token_limit(self):
+        prompt = get_paper_analysis_prompt("y" * (self.client.prompt_token_limit * 6 * 2))
+        truncated = self.client._truncate_prompt(prompt)
+        
+        self.assertLessEqual(count_tokens(truncated, "gpt-4"), self.client.prompt_token_limit)
+        self.assertIn("[texto truncado]", truncated)
+        self.assertTrue(truncated.startswith(prompt[:100]))
+
+if __name__ == "__main__":
+    unittest.main()